@@ -1,372 +1,36 @@
 #!/usr/bin/env python
 # coding: utf-8
 
-import pprint 
-import math
-from collections import defaultdict, deque
-
-
-
-#Gradio
-import gradio as gr
-from io import BytesIO
-import base64
-
-
-
-class Forest:
-     def __init__(self):
-          self.rootnodes = set()
-          self.allnodes = set()
-          self.parentdict = {}
-          self.rootdict = {}
-          
-
-     def add_root(self, root):
-          self.rootnodes.add(root)
-          self.allnodes.add(root)
-          self.parentdict[root] = None
-          self.rootdict[root] = root
-
-
-     def add_edge(self, beg_node, end_node):
-          #beg_node in forest already
-          #end_node not in forest
-
-          self.allnodes.add(end_node)
-          self.parentdict[end_node] = beg_node
-          self.rootdict[end_node] = self.rootdict[beg_node]
-
-     def path_to_root(self, node):
-          path = []
-          root = self.rootdict[node]
-          current_node = node
-          while(current_node != root):
-               parent = self.parentdict[current_node]
-               path.append((current_node,parent))
-               current_node = parent
-          return path
-               
-
-     def bloom(self, node_1, node_2):
-          root = self.rootdict[node_1] #same root for node_2 as well
-          blossom_vertices = set()
-          stem = []
-          has_stem = False
-          path_1 = self.path_to_root(node_1)
-          path_2 = self.path_to_root(node_2)
-          least_common_ancestor = root
-          blossom_cycle = []
-     
-          while(path_1 and path_2):
-               (v_1,w_1) = path_1[-1]
-               (v_2,w_2) = path_2[-1]
-               if v_1 == v_2 and w_1 == w_2:
-                    stem.append((w_1,v_1))
-                    path_1.pop()
-                    path_2.pop()
-                    least_common_ancestor = v_1
-               elif v_1 != v_2:
-                    break
-  
-          blossom_cycle.extend([(y,x) for (x,y) in reversed(path_1)])
-          blossom_cycle.append((node_1, node_2))
-          blossom_cycle.extend(path_2)
-          for x,y in blossom_cycle:
-               blossom_vertices.add(x)
-          if stem:
-               has_stem = True
-          return (stem, blossom_vertices, blossom_cycle, least_common_ancestor, has_stem)
-     
-
-class Matching:
-    #match_dict = {v: match[v] for all v in vertex_list}
-    #Note: If no match, match[v] is set to  None
-    def __init__(self, match_dict):
-         self.matchededges = set()
-         self.matchedvertices = set()
-         cardinality = 0
-         for v in match_dict:
-             if match_dict[v]!= None:
-                 self.matchedvertices.add(v)
-                 cardinality += 1
-                 self.matchededges.add((v,match_dict[v]))
+import hashlib
+import itertools
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from time import monotonic
+
+import numpy as np
+
+#the solver and the streaming graph readers live next to this directory in the repository, and
+#build.sh copies them next to this module in the directory deployed to Heroku;
+#gradio is only imported by main(), so that importing this module (in tests, or in the worker
+#processes) is cheap and starts nothing
+try:
+    from graph_io import graph_format, read_edge_list, read_graph
+    from maximum_matching import IndexedGraph, solve_indexed_graph, solve_indexed_matching
+except ImportError:
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+    from graph_io import graph_format, read_edge_list, read_graph
+    from maximum_matching import IndexedGraph, solve_indexed_graph, solve_indexed_matching
 
-    
-         self.cardinality = (cardinality//2)
-         self.matchdict = match_dict
-         
-         
-         
-    def xor_even_path(self, even_path):
-         
-         #even_path = [(v_0,v_1), (v_1,v_2),...,(v_{2n-1}, v_2n)]
-         if len(even_path) == 0:
-             return
-         
-         not_in_match = True
-         for edge in even_path:
-             if not_in_match:
-                 self.matchdict[edge[0]] = edge[1]
-                 self.matchdict[edge[1]] = edge[0]
-                 self.matchededges.add((edge[0],edge[1]))
-                 self.matchededges.add((edge[1], edge[0]))
-                 not_in_match = False
-             else:
-                 self.matchededges.discard((edge[0],edge[1]))
-                 self.matchededges.discard((edge[1],edge[0]))
-                 not_in_match = True
 
-        
-         self.matchedvertices.add(even_path[0][0])
-         self.matchedvertices.discard(even_path[-1][1])
-         self.matchdict[even_path[-1][1]] = None
-
-    def xor_aug_path(self, aug_path):
-         #aug_path = [(v_0,v_1), (v_1,v_2),...,(v_{n-1}, v_n)]
-         if len(aug_path) == 0:
-             return
-         
-         not_in_match = True
-         for edge in aug_path:
-             if not_in_match:
-                 self.matchdict[edge[0]] = edge[1]
-                 self.matchdict[edge[1]] = edge[0]
-                 self.matchededges.add((edge[0],edge[1]))
-                 self.matchededges.add((edge[1], edge[0]))
-                 not_in_match = False
-             else:
-                 self.matchededges.discard((edge[0],edge[1]))
-                 self.matchededges.discard((edge[1],edge[0]))
-                 not_in_match = True
-
-        
-         self.matchedvertices.add(aug_path[0][0])
-         self.matchedvertices.add(aug_path[-1][1])
-         self.cardinality += 1
-
-def create_quotient(vertices, graph_adj_dict, current_matching, blossom_vertices, least_common_ancestor):
-     quotient_vertices = vertices - blossom_vertices
-     quotient_vertices.add(least_common_ancestor)
-     quotient_graph_adj_dict = defaultdict(list)
-     section = {}
-     for v in graph_adj_dict:
-          if v not in blossom_vertices:
-               blossom_vertex_detected = False
-               for w in graph_adj_dict[v]:
-                    if w not in blossom_vertices:
-                         quotient_graph_adj_dict[v].append(w)
-                    else:
-                         if blossom_vertex_detected == False:
-                              quotient_graph_adj_dict[v].append(least_common_ancestor)
-                              quotient_graph_adj_dict[least_common_ancestor].append(v)
-                              section[(v,least_common_ancestor)] = (v,w)
-                              blossom_vertex_detected = True
-
-     quotient_match_dict = {}
-     for v in quotient_vertices:
-          quotient_match_dict[v] = current_matching.matchdict[v]
-     quotient_matching = Matching(quotient_match_dict)
-
-     return quotient_vertices, quotient_graph_adj_dict, quotient_matching, section
-
-def find_even_path(node, blossom_cycle):
-     #blossom_cycle = [(lca, v_1), (v_1, v_2), ..... (v_2n, lca)]
-     #              = [unmatched, matched, unmatched,.......matched, unmatched]
-     count = 0
-     path = []
-     while(blossom_cycle[count][0]!= node):
-          path.append((blossom_cycle[count][1],blossom_cycle[count][0]))
-          count +=1
-     if (count % 2) == 0:
-          return list(reversed(path))
-     else:
-          return blossom_cycle[count:]
-          
-  
-def find_aug_path(graph_adjacency_dict, current_matching, vertices):
-        #label vertices with 0 (even), 1 (odd) or None
-        vertex_label = defaultdict(lambda: None)
-        
-        #label matched edges as explored
-        is_explored_edge = defaultdict(lambda: False)
-        for v in vertices:
-            for w in vertices:
-                if (v,w) in current_matching.matchededges:
-                    is_explored_edge[(v,w)] = True
-
-        #create a forest with trees (just roots) of unmatched vertices
-        #create a queue of to_be_explored vertices
-        #If v in the  queue, v will be even labelled
-        to_be_explored_nodes = deque()
-        F = Forest()
-        for u in vertices  - current_matching.matchedvertices:
-            vertex_label[u] = 0
-            F.add_root(u)
-            to_be_explored_nodes.append(u)
-       
-
-        while to_be_explored_nodes:
-             v = to_be_explored_nodes.popleft()
-             for w in graph_adjacency_dict[v]:
-                  if is_explored_edge[(v,w)] is False:
-                       if w not in F.allnodes:
-                            vertex_label[w] = 1
-                            F.add_edge(v, w)
-                            x = current_matching.matchdict[w]
-                            vertex_label[x] = 0
-                            F.add_edge(w, x)
-                            to_be_explored_nodes.append(x)
-                            is_explored_edge[(w,x)] = True
-                            is_explored_edge[(x,w)] = True
-
-                       else:
-                            if (vertex_label[w] % 2) == 0:
-                                 if F.rootdict[w] != F.rootdict[v]:
-                                      my_aug_path = []
-                                      for edge in reversed(F.path_to_root(v)):
-                                           my_aug_path.append((edge[1], edge[0]))
-                                      my_aug_path.append((v,w))
-                                      my_aug_path.extend(F.path_to_root(w))
-                                      return my_aug_path
-                                 else:
-                                      #BLOSSOMS!!!!!!!
-                                      (stem, blossom_vertices, blossom_cycle, least_common_ancestor, has_stem) = F.bloom(v,w)
-                                      if has_stem:
-                                           #toggle_stem
-                                           current_matching.xor_even_path(stem)                                      
-                                      quotient_vertices, quotient_graph_adjacency_dict, quotient_matching, section = (
-                                           create_quotient(
-                                                vertices, graph_adjacency_dict, current_matching,
-                                                blossom_vertices, least_common_ancestor))
-                                      
-                                      quotient_aug_path = find_aug_path(quotient_graph_adjacency_dict,
-                                                                        quotient_matching, quotient_vertices)
-                                      
-                                      if not quotient_aug_path:
-                                           return quotient_aug_path
-                                      elif (quotient_aug_path[0][0] != least_common_ancestor and
-                                           quotient_aug_path[-1][1] != least_common_ancestor):
-                                           return quotient_aug_path
-                                      else:
-                                           if quotient_aug_path[0][0] == least_common_ancestor:
-                                                quotient_aug_path = list(reversed(quotient_aug_path))
-                                                for pos, (x,y) in  enumerate(quotient_aug_path):
-                                                     quotient_aug_path[pos] = (y,x)
-                                                     
-                                           #So quotient_aug_path[-1][1] = least_common_ancestor:
-                                           v = quotient_aug_path[-1][0]
-                                           quotient_aug_path.pop()
-                                           attaching_point_to_bloom = section[(v,least_common_ancestor)][1]
-                                           quotient_aug_path.append((v,attaching_point_to_bloom))
-                                           quotient_aug_path.extend(find_even_path(attaching_point_to_bloom, blossom_cycle))
-                                           return quotient_aug_path
-
-
-                  is_explored_edge[(v,w)] = True
-                  is_explored_edge[(w,v)] = True
-
-
-
-     
-def find_max_matching(graph_adjacency_dict, current_matching, vertices):
-        my_path = find_aug_path(graph_adjacency_dict, current_matching, vertices)
-        if not my_path:
-            return current_matching.matchdict, current_matching.cardinality
-        else:
-            current_matching.xor_aug_path(my_path)
-            return find_max_matching(graph_adjacency_dict, current_matching, vertices)
-     
-def find_a_maximal_matching(graph_adjacency_dict,vertices):
-     """returns a maximal matching given vertices(set) and graph_adjacency_dict"""
-     
-     my_match_dict = {}
-     outdegree = {}
-     for v in vertices:
-          my_match_dict[v] = None
-          outdegree[v] = len(graph_adjacency_dict[v])
-          
-     for v in sorted(outdegree, key=outdegree.get):
-       if my_match_dict[v] is None:
-               candidates = [w for w in graph_adjacency_dict[v] if my_match_dict[w] == None]
-               if candidates:
-                    w = min(candidates, key = lambda x: outdegree[x])
-                    my_match_dict[v] = w
-                    my_match_dict[w] = v
- 
-     return  Matching(my_match_dict)
-
-
-def create_graph_adjacency_dict(adjacency_matrix, list_of_vertices):
-     """returns the graph adjacency dictionary given the adjacency matrix, list_of_vertices"""
-     assert(len(adjacency_matrix) == len(list_of_vertices)), "no_of_vertices not compatible with adjacency matrix row dimension"
-     n = len(list_of_vertices)
-     graph_adjacency_dict = defaultdict(list)
-     for i in range(n):
-          for j in range(n):
-              assert(adjacency_matrix[i][j] == adjacency_matrix[j][i]), "adjacency matrix is not symmetric"
-              if adjacency_matrix[i][j] == 1:
-                   graph_adjacency_dict[list_of_vertices[i]].append(list_of_vertices[j])
-              else:
-                   graph_adjacency_dict[list_of_vertices[i]].extend([])
-         
-     return graph_adjacency_dict
-
-
-
-               
-     
-     
-def run_blossoms_algorithm(adjacency_matrix, list_of_vertices = None):
-     start_time = time()
-     
-     no_of_vertices = len(adjacency_matrix)
-     if list_of_vertices is None:
-          list_of_vertices = list(range(no_of_vertices))
-
-          
-     #ensuring matrix dimensions are compatible with list of_vertices
-     assert(no_of_vertices == len(list_of_vertices)), "no_of_vertices not compatible with adjacency matrix row dimension"
-     assert(all([no_of_vertices == len(row) for row in adjacency_matrix])), "no_of_vertices not compatible with adjacency matrix col dimension"
-     
-          
-     #Create graph_adjacency_dict
-     graph_adjacency_dict =  create_graph_adjacency_dict(adjacency_matrix, list_of_vertices)
-     vertices = set(list_of_vertices)
-
-     #Find a maximal matching
-     current_matching = find_a_maximal_matching(graph_adjacency_dict,vertices)
-
-     #Find maximum matching
-     final_match_dict, no_of_matched_edges = find_max_matching(graph_adjacency_dict, current_matching, vertices)
-
-     #Print results and statistics
-     print("Maximum Matching : ", end ='')
-     pprint.pprint(final_match_dict)
-
-     print(f"Number of matched edges : {no_of_matched_edges}")
-
-     print(f"Time taken : {time()-start_time}")
-             
-  
 
 def run_blossoms_algorithm_gradio(adjacency_matrix, list_of_vertices=None):
-     
-     no_of_vertices = len(adjacency_matrix)
-     if list_of_vertices is None:
-          list_of_vertices = list(range(no_of_vertices))
-     
-     #Create graph_adjacency_dict
-     graph_adjacency_dict =  create_graph_adjacency_dict(adjacency_matrix, list_of_vertices)
-     vertices = set(list_of_vertices)
-
-     #Find a maximal matching
-     current_matching = find_a_maximal_matching(graph_adjacency_dict,vertices)
-
-     #Find maximum matching
-     final_match_dict, no_of_matched_edges = find_max_matching(graph_adjacency_dict, current_matching, vertices)
-
-
+     """returns (number of matched edges, match dict) given a valid adjacency matrix"""
+     graph = IndexedGraph.from_adjacency_matrix(adjacency_matrix, list_of_vertices)
+     final_match_dict, no_of_matched_edges = solve_indexed_graph(graph)
      return no_of_matched_edges, final_match_dict
     
 
@@ -396,11 +60,11 @@ def check_validity(adjacency_matrix):
         row_0_length = len(adjacency_matrix[0])
         assert(row_0_length == len(adjacency_matrix)), "Invalid adjacency matrix : it should be a square matrix"
         assert(all([row_0_length == row_length for row_length in row_lengths])), "Invalid adjacency matrix : it should be a square matrix"
-        for i in range(row_0_length):
-            assert(adjacency_matrix[i][i] == 0), "Invalid adjacency matrix : no self loops allowed"
-            for j in range(i+1,row_0_length):
-                assert(adjacency_matrix[i][j]==0 or adjacency_matrix[i][j]==1), "Invalid adjacency matrix : all entries must be 0 or 1"
-                assert(adjacency_matrix[i][j] == adjacency_matrix[j][i]), "Invalid adjacency matrix : it should be a symmetric matrix"
+        #whole-array checks instead of walking the n^2 entries in Python
+        adjacency_array = np.asarray(adjacency_matrix)
+        assert(not adjacency_array.diagonal().any()), "Invalid adjacency matrix : no self loops allowed"
+        assert(((adjacency_array == 0) | (adjacency_array == 1)).all()), "Invalid adjacency matrix : all entries must be 0 or 1"
+        assert((adjacency_array == adjacency_array.T).all()), "Invalid adjacency matrix : it should be a symmetric matrix"
                 
         
     except AssertionError as msg:
@@ -424,22 +88,355 @@ def convert_dict_to_string(my_dict):
     
 
 
-def run_max_matcher(matrix):
-    adjacency_matrix = get_adjacency_matrix(matrix)
-    print(adjacency_matrix)
+class ResultCache:
+    """bounded LRU cache of (number of matched edges, matching string) keyed by graph_key, whose entries
+       expire ttl seconds after they are stored (ttl None: never); hits and misses count the lookups"""
+
+    def __init__(self, max_size = 128, ttl = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (self.ttl is None or monotonic() - entry[0] < self.ttl):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (monotonic(), result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last = False)
+
+    def stats(self):
+        """returns the counts of the cache, for monitoring: nothing is printed or logged per request"""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
+
+
+def graph_key(adjacency_matrix):
+    """returns a hash of the adjacency structure, the same for every way of typing the same matrix"""
+    try:
+        adjacency_array = np.asarray(adjacency_matrix)
+    except ValueError:
+        #rows of different lengths
+        return None
+    if adjacency_array.ndim != 2:
+        return None
+    #the entries as int64 bytes, with the shape, so that whitespace and number formatting do not matter
+    #(the entries are kept as they are: a matrix with a 2 must not hit the cached result of one with a 1)
+    normalised = adjacency_array.astype(np.int64)
+    return hashlib.sha256(repr(normalised.shape).encode() + normalised.tobytes()).hexdigest()
+
+
+result_cache = ResultCache(int(os.environ.get("MAXMATCHER_CACHE_SIZE", 128)),
+                           float(os.environ.get("MAXMATCHER_CACHE_TTL", 3600)) or None)
+
+
+def solve_matrix(adjacency_matrix):
+    """returns (number of matched edges, matching string, None), or (message, message, None) for an
+       invalid matrix"""
     is_valid, my_msg = check_validity(adjacency_matrix)
     if is_valid:
         no_of_matched_edges, final_match_dict = run_blossoms_algorithm_gradio(adjacency_matrix)
-        return no_of_matched_edges, convert_dict_to_string(final_match_dict)
+        return no_of_matched_edges, convert_dict_to_string(final_match_dict), None
     else:
-        return my_msg, my_msg
-        
-    
+        return my_msg, my_msg, None
 
 
+def solve_graph_file(path):
+    """returns (number of matched edges, summary, path of a file with the matched edges) for a graph file:
+       an edge list (one edge "v w" per line), a NumPy CSR .npz, Matrix Market or DIMACS file; or
+       (message, message, None) if it cannot be read. The JobQueue deletes the file when it forgets the job"""
+    try:
+        try:
+            graph = read_graph(path)
+        except ValueError:
+            #an edge list whose vertices are not integers; the error of any other format is the user's
+            if graph_format(path) != "edge_list":
+                raise
+            graph = read_edge_list(path, vertex_type = str)
+    except (AssertionError, ValueError, OSError) as msg:
+        my_msg = f"Invalid graph file : {msg}"
+        return my_msg, my_msg, None
+
+    current_matching = solve_indexed_matching(graph)
+    labels, no_of_matched_edges = graph.labels, current_matching.cardinality
+    #the matching as an edge list, one matched edge per line
+    with tempfile.NamedTemporaryFile("w", prefix = "maximum_matching_", suffix = ".txt", delete = False) as output:
+        output.write(f"# maximum matching: {no_of_matched_edges} edges, {len(graph)} vertices\n")
+        for v, w in enumerate(current_matching.mate):
+            if v < w:
+                output.write(f"{labels[v]} {labels[w]}\n")
+    summary = (f"{no_of_matched_edges} matched edges, {len(graph) - 2*no_of_matched_edges} of the "
+               f"{len(graph)} vertices unmatched : download the matched edges below")
+    return no_of_matched_edges, summary, output.name
+
+
+def _run_job(function, args, connection):
+    #runs function(*args) in a worker process, sends (is_valid, result) back
+    try:
+        result = function(*args)
+        connection.send((not isinstance(result[0], str), result))
+    except Exception as error:
+        connection.send((False, (f"Error : {error}",)*2 + (None,)))
+    finally:
+        connection.close()
+
+
+def estimated_cost(no_of_vertices):
+    """rough number of steps to solve a graph on no_of_vertices vertices given by its adjacency matrix:
+       parsing and checking the n^2 entries dominates the indexed solver"""
+    return no_of_vertices**2
+
+
+class Job:
+    __slots__ = ("id", "function", "args", "key", "status", "result", "started", "finished", "process", "connection")
+
+    def __init__(self, job_id, function, args, key):
+        self.id = job_id
+        self.function = function
+        self.args = args
+        self.key = key
+        self.status = "queued"
+        self.result = None
+        self.started = None
+        self.finished = None
+        self.process = None
+        self.connection = None
+
+
+class JobQueue:
+    """bounded queue of solver jobs (function, args) served by at most max_workers worker processes. Each job runs in a
+       process of its own so that it can be stopped: after timeout seconds (status "timeout") or by
+       cancel(job_id) (status "cancelled"). submit returns None when max_queued jobs are already
+       waiting; status(job_id) is polled for the result; finished jobs are forgotten after keep seconds,
+       and the result files they returned deleted. Valid results are stored in cache, if given."""
+
+    def __init__(self, max_workers = 2, max_queued = 16, timeout = 60, keep = 600, cache = None):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.keep = keep
+        self.cache = cache
+        self.jobs = {}
+        self.queued = deque()
+        self.running = []
+        self.job_ids = itertools.count(1)
+        self.condition = threading.Condition()
+        #workers started by spawn or forkserver import this module, which starts nothing
+        self.context = multiprocessing.get_context()
+        self.dispatcher = threading.Thread(target = self._dispatch, daemon = True)
+        self.dispatcher.start()
+
+    def submit(self, function, args, key = None):
+        with self.condition:
+            if len(self.queued) >= self.max_queued:
+                return None
+            job = Job(str(next(self.job_ids)), function, args, key)
+            self.jobs[job.id] = job
+            self.queued.append(job)
+            self.condition.notify_all()
+            return job.id
+
+    def status(self, job_id):
+        """returns (status, result): status is one of queued, running, done, failed, timeout, cancelled
+           or unknown, result is what the job function returned once done"""
+        with self.condition:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return "unknown", None
+            return job.status, job.result
+
+    def wait(self, job_id, seconds):
+        """waits up to seconds for the job to finish, then returns status(job_id)"""
+        deadline = monotonic() + seconds
+        with self.condition:
+            while job_id in self.jobs and self.jobs[job_id].status in ("queued", "running"):
+                if monotonic() >= deadline:
+                    break
+                self.condition.wait(deadline - monotonic())
+        return self.status(job_id)
+
+    def cancel(self, job_id):
+        """stops the job if it is queued or running; returns whether it was"""
+        with self.condition:
+            job = self.jobs.get(job_id)
+            if job is None or job.status not in ("queued", "running"):
+                return False
+            if job.status == "queued":
+                self.queued.remove(job)
+            else:
+                self._stop(job)
+            self._finish(job, "cancelled")
+            return True
+
+    def _stop(self, job):
+        job.process.terminate()
+        job.process.join()
+        job.connection.close()
+        self.running.remove(job)
+
+    def _finish(self, job, status, result = None):
+        job.status = status
+        job.result = result
+        job.function = job.args = job.process = job.connection = None
+        job.finished = monotonic()
+        self.condition.notify_all()
+
+    def _forget(self, job):
+        #the file of a result (its third output, e.g. the matched edges of solve_graph_file) goes with the job
+        if job.result is not None and len(job.result) > 2 and job.result[2] is not None:
+            try:
+                os.remove(job.result[2])
+            except OSError:
+                pass
+
+    def _dispatch(self):
+        with self.condition:
+            while True:
+                now = monotonic()
+                for job in list(self.running):
+                    if job.connection.poll():
+                        try:
+                            is_valid, result = job.connection.recv()
+                        except EOFError:
+                            is_valid, result = False, None
+                        job.process.join()
+                        job.connection.close()
+                        self.running.remove(job)
+                        self._finish(job, "done" if result is not None else "failed", result)
+                        if is_valid and self.cache is not None and job.key is not None:
+                            self.cache.put(job.key, result)
+                    elif not job.process.is_alive():
+                        job.connection.close()
+                        self.running.remove(job)
+                        self._finish(job, "failed")
+                    elif now - job.started > self.timeout:
+                        self._stop(job)
+                        self._finish(job, "timeout")
+
+                while self.queued and len(self.running) < self.max_workers:
+                    job = self.queued.popleft()
+                    receiver, sender = self.context.Pipe(duplex = False)
+                    job.process = self.context.Process(target = _run_job, args = (job.function, job.args, sender), daemon = True)
+                    job.process.start()
+                    sender.close()
+                    job.connection = receiver
+                    job.status = "running"
+                    job.started = monotonic()
+                    self.running.append(job)
+
+                for job_id in [job_id for job_id, job in self.jobs.items()
+                               if job.finished is not None and now - job.finished > self.keep]:
+                    self._forget(self.jobs.pop(job_id))
+
+                self.condition.wait(0.05)
+
+
+job_queue = None
+job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """returns the JobQueue of the app, started on first use"""
+    global job_queue
+    with job_queue_lock:
+        if job_queue is None:
+            job_queue = JobQueue(int(os.environ.get("MAXMATCHER_WORKERS", 2)), int(os.environ.get("MAXMATCHER_MAX_QUEUED", 16)),
+                                 float(os.environ.get("MAXMATCHER_TIMEOUT", 60)), cache = result_cache)
+        return job_queue
+
+
+#largest estimated_cost accepted, and seconds a request waits for its job before returning the job id to poll
+cost_budget = float(os.environ.get("MAXMATCHER_COST_BUDGET", 3000**2))
+#largest graph file accepted (bytes)
+max_upload_size = float(os.environ.get("MAXMATCHER_MAX_UPLOAD_MB", 100))*2**20
+wait_seconds = float(os.environ.get("MAXMATCHER_WAIT", 10))
+
+
+def run_max_matcher(matrix, graph_file = None):
+    #"job:<id>" polls a job submitted earlier and "cancel:<id>" cancels it
+    matrix = matrix or ""
+    job_queue = get_job_queue()
+    command, _, job_id = matrix.strip().partition(":")
+    if command in ("job", "cancel") and job_id.strip():
+        job_id = job_id.strip()
+        if command == "cancel":
+            my_msg = f"Job {job_id} cancelled" if job_queue.cancel(job_id) else f"Job {job_id} is not queued or running"
+            return my_msg, my_msg, None
+        return job_result(job_id, *job_queue.status(job_id))
+
+    if graph_file is not None:
+        #gradio passes a temporary file (or its path)
+        path = getattr(graph_file, "name", graph_file)
+        if os.path.getsize(path) > max_upload_size:
+            my_msg = f"Rejected : graph files of more than {max_upload_size/2**20:g} MB are not accepted"
+            return my_msg, my_msg, None
+        job_id = job_queue.submit(solve_graph_file, (path,))
+        if job_id is None:
+            my_msg = "Rejected : too many graphs are waiting, please try again later"
+            return my_msg, my_msg, None
+        return job_result(job_id, *job_queue.wait(job_id, wait_seconds))
+
+    #admission control, before parsing, from the size of the text rather than its rows: a square matrix has
+    #as many entries (the commas, plus one per line) as its number of lines squared, and an entry with its
+    #separators takes up to about 4 characters, so that a few very long lines are rejected as well
+    text = matrix.strip()
+    no_of_lines = text.count('\n') + 1
+    no_of_entries = text.count(',') + no_of_lines
+    if max(estimated_cost(no_of_lines), no_of_entries, len(text)//4) > cost_budget:
+        my_msg = (f"Rejected : a matrix of {no_of_lines} lines and {no_of_entries} entries exceeds the size "
+                  f"this server accepts")
+        return my_msg, my_msg, None
 
-gr.Interface(
-  run_max_matcher,
-  gr.inputs.Textbox(lines=5, placeholder="Enter the adjacency matrix in the format: Each row in a new line, each matrix entry in the rows separated by commas. Vertices are implicitly assumed to be labelled 0,1,....", default=None, numeric=False, label= "Adjacency matrix"),
-     [gr.outputs.Textbox(label="Number of edges in maximum matching"),gr.outputs.Textbox(label="A maximum matching")], title="MaxMatcher", description="Enter the adjacency matrix of any undirected graph. The MaxMatcher will output a maximum matching for it.").launch()  
-
+    adjacency_matrix = get_adjacency_matrix(matrix)
+    print(adjacency_matrix)
+    #only valid matrices are cached, so a hit needs no validation either
+    key = graph_key(adjacency_matrix) if adjacency_matrix else None
+    result = result_cache.get(key) if key is not None else None
+    if result is not None:
+        return result
+    job_id = job_queue.submit(solve_matrix, (adjacency_matrix,), key)
+    if job_id is None:
+        my_msg = "Rejected : too many graphs are waiting, please try again later"
+        return my_msg, my_msg, None
+    return job_result(job_id, *job_queue.wait(job_id, wait_seconds))
+
+
+def job_result(job_id, status, result):
+    #the two outputs of run_max_matcher for a job
+    if status == "done":
+        return result
+    messages = {"queued": f"Job {job_id} is queued : enter job:{job_id} to get its result, or cancel:{job_id}",
+                "running": f"Job {job_id} is running : enter job:{job_id} to get its result, or cancel:{job_id}",
+                "failed": f"Job {job_id} failed",
+                "timeout": f"Job {job_id} took too long and was stopped",
+                "cancelled": f"Job {job_id} was cancelled",
+                "unknown": f"Unknown job {job_id}"}
+    return messages[status], messages[status], None
+
+
+def main():
+    import gradio as gr
+    gr.Interface(
+      run_max_matcher,
+      [gr.inputs.Textbox(lines=5, placeholder="Enter the adjacency matrix in the format: Each row in a new line, each matrix entry in the rows separated by commas. Vertices are implicitly assumed to be labelled 0,1,.... Large graphs run in the background: enter job:<id> to get the result, or cancel:<id>", default=None, numeric=False, label= "Adjacency matrix"),
+       gr.inputs.File(type="file", optional=True, label="Or upload a graph file: edge list (one edge \"v w\" per line), CSR .npz, Matrix Market (.mtx) or DIMACS (.col)")],
+         [gr.outputs.Textbox(label="Number of edges in maximum matching"),gr.outputs.Textbox(label="A maximum matching"),gr.outputs.File(label="Matched edges (uploaded graphs)")], title="MaxMatcher", description="Enter the adjacency matrix of any undirected graph, or upload a graph file. The MaxMatcher will output a maximum matching for it.").launch()
+
+
+if __name__ == "__main__":
+    main()
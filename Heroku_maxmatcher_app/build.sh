@@ -0,0 +1,12 @@
+#!/bin/sh
+# builds the directory deployed to Heroku: this app directory with the solver modules of the
+# repository (../maximum_matching.py and ../graph_io.py) next to it, so that it runs on its own.
+# usage: sh build.sh <build directory>, then deploy the build directory, e.g.
+#   cd <build directory> && git init && git add . && git commit -m deploy && git push --force <heroku remote> HEAD:main
+set -e
+app_dir=$(cd "$(dirname "$0")" && pwd)
+build_dir=$1
+test -n "$build_dir" || { echo "usage: sh build.sh <build directory>" >&2; exit 2; }
+mkdir -p "$build_dir"
+cp "$app_dir/MaxMatcher_a_web_app.py" "$app_dir/Procfile" "$app_dir/setup.sh" "$app_dir/requirements.txt" "$build_dir"
+cp "$app_dir/../maximum_matching.py" "$app_dir/../graph_io.py" "$build_dir"
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+"""benchmarks the maximum matching engines on seeded random and adversarial graphs, records wall time
+   and peak memory in a JSON file and flags regressions against a stored baseline
+
+   python benchmark_maximum_matching.py --output baseline.json
+   python benchmark_maximum_matching.py --baseline baseline.json --output latest.json"""
+
+
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import tracemalloc
+from time import perf_counter
+
+from maximum_matching import ENGINES, IndexedGraph, solve_indexed_graph, two_colouring
+
+
+def gnp_graph(n, p, seed = 0):
+     """returns the edge list of an Erdos-Renyi G(n,p) graph on 0,1,...,n-1 (geometric skipping, O(n + m))"""
+     rng = random.Random(seed)
+     edge_list = []
+     if p <= 0:
+          return edge_list
+     if p >= 1:
+          return [(v, w) for w in range(n) for v in range(w)]
+     log_q = math.log(1 - p)
+     v, w = -1, 1
+     while w < n:
+          v += 1 + int(math.log(1 - rng.random())/log_q)
+          while v >= w and w < n:
+               v -= w
+               w += 1
+          if w < n:
+               edge_list.append((v, w))
+     return edge_list
+
+
+def random_regular_graph(n, d, seed = 0):
+     """returns the edge list of a random d-regular graph on 0,1,...,n-1 (configuration model; the few self
+        loops and repeated edges of the last attempt are dropped, so a handful of degrees may be below d)"""
+     assert((n*d) % 2 == 0), "n*d must be even"
+     rng = random.Random(seed)
+     for attempt in range(10):
+          points = [v for v in range(n) for _ in range(d)]
+          rng.shuffle(points)
+          edge_set = set()
+          for v, w in zip(points[::2], points[1::2]):
+               if v != w:
+                    edge_set.add((min(v, w), max(v, w)))
+          if len(edge_set) == n*d//2:
+               break
+     return sorted(edge_set)
+
+
+def grid_graph(rows, cols):
+     """returns the edge list of the rows x cols grid, vertex r*cols + c at row r, column c"""
+     edge_list = []
+     for r in range(rows):
+          for c in range(cols):
+               if c + 1 < cols:
+                    edge_list.append((r*cols + c, r*cols + c + 1))
+               if r + 1 < rows:
+                    edge_list.append((r*cols + c, (r + 1)*cols + c))
+     return edge_list
+
+
+def nested_blossoms_graph(depth, width = 3):
+     """returns the edge list of width**depth vertices forming odd cycles nested depth deep (width is odd):
+        level k is a cycle through the bases of width copies of level k-1, based at the base of the first
+        copy; a path 0-1-2 is hung at the outermost base, so that blossoms are found with a stem"""
+     assert(width % 2 == 1 and width >= 3), "width must be an odd number >= 3"
+     edge_list = []
+
+     def build(level, first):
+          #builds level on first, first+1, ... and returns (base, next free vertex)
+          if level == 0:
+               return first, first + 1
+          bases = []
+          for _ in range(width):
+               base, first = build(level - 1, first)
+               bases.append(base)
+          for k in range(width):
+               edge_list.append((bases[k], bases[(k + 1) % width]))
+          return bases[0], first
+
+     base, first = build(depth, 3)
+     edge_list.extend([(0, 1), (1, 2), (2, base)])
+     return edge_list
+
+
+GENERATORS = {
+     "gnp": lambda n, seed: gnp_graph(n, 3/max(n, 1), seed),
+     "regular": lambda n, seed: random_regular_graph(n - n % 2, 3, seed),
+     "grid": lambda n, seed: grid_graph(int(math.sqrt(n)), int(math.sqrt(n))),
+     "nested_blossoms": lambda n, seed: nested_blossoms_graph(max(1, round(math.log(n, 3)))),
+}
+
+#families started from an empty matching instead of the engines' initial matching, which would
+#otherwise leave few or no augmentations (and blossoms) to find
+FROM_EMPTY_MATCHING = {"nested_blossoms"}
+
+SIZES = [1000, 10000, 100000]
+QUICK_SIZES = [100, 1000]
+
+#the reference engine is quadratic per augmentation, it is only run up to this many vertices
+REFERENCE_MAX_VERTICES = 300
+
+
+def measure(graph, engine, repeat = 1, memory = True, initial_matching = None):
+     """returns {"time": best wall time of repeat runs (s), "peak_memory": bytes, "cardinality": ...}"""
+     times = []
+     for _ in range(repeat):
+          start_time = perf_counter()
+          final_match_dict, no_of_matched_edges = solve_indexed_graph(graph, engine, initial_matching = initial_matching)
+          times.append(perf_counter() - start_time)
+     result = {"time": min(times), "cardinality": no_of_matched_edges}
+     if memory:
+          #tracemalloc slows the run down, so it is measured separately
+          tracemalloc.start()
+          solve_indexed_graph(graph, engine, initial_matching = initial_matching)
+          result["peak_memory"] = tracemalloc.get_traced_memory()[1]
+          tracemalloc.stop()
+     return result
+
+
+def run_benchmarks(generators = None, sizes = None, engines = None, repeat = 1, memory = True, seed = 0, log = None,
+                   reference_max_vertices = REFERENCE_MAX_VERTICES):
+     """returns {"generator/size/engine": measure(...)} over the sweep"""
+     results = {}
+     for name in generators or GENERATORS:
+          for size in sizes or SIZES:
+               graph = IndexedGraph.from_edges(GENERATORS[name](size, seed))
+               initial_matching = {} if name in FROM_EMPTY_MATCHING else None
+               is_bipartite = two_colouring(graph) is not None
+               cardinalities = set()
+               for engine in engines or ENGINES:
+                    if engine == "reference" and len(graph) > reference_max_vertices:
+                         continue
+                    if engine == "hopcroft_karp" and not is_bipartite:
+                         continue
+                    key = f"{name}/{size}/{engine}"
+                    results[key] = measure(graph, engine, repeat, memory, initial_matching)
+                    cardinalities.add(results[key]["cardinality"])
+                    if log is not None:
+                         peak_memory = f"{results[key]['peak_memory']/2**20:9.2f} MiB" if memory else ""
+                         log(f"{key:40} {results[key]['time']:10.4f} s  {peak_memory}")
+               assert(len(cardinalities) <= 1), f"engines disagree on {name}/{size}: {sorted(cardinalities)}"
+     return results
+
+
+def find_regressions(results, baseline, tolerance = 0.25, min_time = 0.01):
+     """returns the list of (key, quantity, baseline value, new value) where results are worse than
+        baseline by more than the fraction tolerance; times below min_time seconds are ignored as noise"""
+     regressions = []
+     for key, result in results.items():
+          if key not in baseline:
+               continue
+          old = baseline[key]
+          if old.get("cardinality") is not None and old["cardinality"] != result["cardinality"]:
+               regressions.append((key, "cardinality", old["cardinality"], result["cardinality"]))
+          if max(old["time"], result["time"]) >= min_time and result["time"] > old["time"]*(1 + tolerance):
+               regressions.append((key, "time", old["time"], result["time"]))
+          if "peak_memory" in old and "peak_memory" in result and result["peak_memory"] > old["peak_memory"]*(1 + tolerance):
+               regressions.append((key, "peak_memory", old["peak_memory"], result["peak_memory"]))
+     return regressions
+
+
+def main(argv = None):
+     parser = argparse.ArgumentParser(description = __doc__.split("\n")[0])
+     parser.add_argument("--output", help = "JSON file to write the results to")
+     parser.add_argument("--baseline", help = "JSON file of earlier results to compare with")
+     parser.add_argument("--tolerance", type = float, default = 0.25, help = "allowed slowdown/memory growth (fraction)")
+     parser.add_argument("--generators", nargs = "+", choices = sorted(GENERATORS))
+     parser.add_argument("--engines", nargs = "+", choices = ENGINES)
+     parser.add_argument("--sizes", nargs = "+", type = int)
+     parser.add_argument("--quick", action = "store_true", help = f"sizes {QUICK_SIZES}")
+     parser.add_argument("--repeat", type = int, default = 3)
+     parser.add_argument("--no-memory", action = "store_true", help = "skip the tracemalloc runs")
+     parser.add_argument("--seed", type = int, default = 0)
+     parser.add_argument("--reference-max-vertices", type = int, default = REFERENCE_MAX_VERTICES)
+     args = parser.parse_args(argv)
+
+     results = run_benchmarks(args.generators, args.sizes or (QUICK_SIZES if args.quick else SIZES), args.engines,
+                              args.repeat, not args.no_memory, args.seed, log = print,
+                              reference_max_vertices = args.reference_max_vertices)
+     if args.output:
+          with open(args.output, "w") as f:
+               json.dump({"python": sys.version.split()[0], "platform": platform.platform(), "seed": args.seed,
+                          "results": results}, f, indent = 1, sort_keys = True)
+
+     if args.baseline:
+          with open(args.baseline) as f:
+               baseline = json.load(f)["results"]
+          regressions = find_regressions(results, baseline, args.tolerance)
+          for key, quantity, old, new in regressions:
+               print(f"REGRESSION {key} {quantity}: {old} -> {new}")
+          return 1 if regressions else 0
+     return 0
+
+
+if __name__ == "__main__":
+     sys.exit(main())
@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+"""streaming readers of edge list, DIMACS and Matrix Market files into the IndexedGraph of maximum_matching
+
+   The file is read twice, chunk_size bytes of lines at a time: the first pass counts the degrees, the
+   second one writes the neighbours straight into the CSR indices array, which is then sorted and freed
+   of repeated edges and self loops in place. Peak memory is therefore about the size of the final
+   graph (plus the repeated edges of the file) whatever the size of the file.
+
+   save_graph writes an IndexedGraph in a binary format that load_graph maps into memory without
+   parsing or copying anything: the magic bytes, the length of a JSON header, the header, then at
+   8-byte aligned offsets the CSR indptr (int64) and indices (int32), little-endian, and the labels."""
+
+
+from array import array
+import json
+import mmap
+import os
+import sys
+
+from maximum_matching import IndexedGraph
+
+try:
+     import numpy as np
+except ImportError:
+     np = None
+
+
+CHUNK_SIZE = 1 << 20
+
+MAGIC = b"MMCSR\x00\x00\x01"
+
+
+def _lines(path, chunk_size, skip = 0):
+     #yields the lines of the file path after the first skip lines, chunk_size bytes at a time
+     with open(path) as f:
+          for _ in range(skip):
+               f.readline()
+          while True:
+               lines = f.readlines(chunk_size)
+               if not lines:
+                    return
+               yield lines
+
+
+def _csr(no_of_vertices, degree, index_chunks, labels):
+     #returns the IndexedGraph given degree[v] (counted with repetitions) and index_chunks(), an iterator
+     #over chunks (sources, targets) of the edges (each edge once, self loops excluded) as vertex indices
+     indptr = array('q', [0])*(no_of_vertices + 1)
+     for v in range(no_of_vertices):
+          indptr[v+1] = indptr[v] + degree[v]
+     del degree
+     indices = array('i', bytes(4*indptr[no_of_vertices]))
+     fill = array('q', indptr)
+     for sources, targets in index_chunks():
+          for v, w in zip(sources, targets):
+               indices[fill[v]] = w
+               fill[v] += 1
+               indices[fill[w]] = v
+               fill[w] += 1
+     del fill
+
+     #sort the rows and drop repeated edges, compacting indices in place
+     position = start = 0
+     for v in range(no_of_vertices):
+          end = indptr[v+1]
+          row = indices[start:end]
+          if len(row) > 1:
+               row = array('i', sorted(set(row)))
+          indices[position:position + len(row)] = row
+          position += len(row)
+          indptr[v+1] = position
+          start = end
+     del indices[position:]
+     return IndexedGraph(indptr, indices, labels)
+
+
+def read_edge_list(path, vertex_type = int, comments = "#%", chunk_size = CHUNK_SIZE):
+     """returns the IndexedGraph of an edge list file: one edge "v w" per line (separated by whitespace,
+        further columns such as weights are ignored), vertex labels converted by vertex_type.
+        Blank lines and lines starting with a character of comments are skipped; repeated edges
+        (in either direction) are merged and self loops are dropped, but their vertices are kept"""
+     index = {}
+     degree = array('q')
+
+     def index_chunks(count):
+          for lines in _lines(path, chunk_size):
+               sources = array('i')
+               targets = array('i')
+               for line in lines:
+                    tokens = line.split()
+                    if not tokens or tokens[0][0] in comments:
+                         continue
+                    assert(len(tokens) >= 2), f"edge list line {line!r} has fewer than 2 vertices"
+                    v = vertex_type(tokens[0])
+                    w = vertex_type(tokens[1])
+                    if count:
+                         for u in (v, w):
+                              if u not in index:
+                                   index[u] = len(index)
+                                   degree.append(0)
+                    i, j = index[v], index[w]
+                    if i != j:
+                         if count:
+                              degree[i] += 1
+                              degree[j] += 1
+                         else:
+                              sources.append(i)
+                              targets.append(j)
+               if not count:
+                    yield sources, targets
+
+     for _ in index_chunks(True):
+          pass
+     labels = list(index)
+     return _csr(len(labels), degree, lambda: index_chunks(False), labels)
+
+
+def _read_1_based(path, no_of_vertices, pairs, chunk_size, skip = 0):
+     #returns the IndexedGraph on the vertices 1,...,no_of_vertices given pairs(lines), an iterator over
+     #the (v, w) edges (1-based) on the lines of a chunk; the first skip lines of the file are ignored
+     degree = array('q', bytes(8*no_of_vertices))
+     for lines in _lines(path, chunk_size, skip):
+          for v, w in pairs(lines):
+               assert(1 <= v <= no_of_vertices and 1 <= w <= no_of_vertices), f"vertex {max(v, w)} out of range"
+               if v != w:
+                    degree[v-1] += 1
+                    degree[w-1] += 1
+
+     def index_chunks():
+          for lines in _lines(path, chunk_size, skip):
+               sources = array('i')
+               targets = array('i')
+               for v, w in pairs(lines):
+                    if v != w:
+                         sources.append(v - 1)
+                         targets.append(w - 1)
+               yield sources, targets
+
+     return _csr(no_of_vertices, degree, index_chunks, range(1, no_of_vertices + 1))
+
+
+def read_dimacs(path, chunk_size = CHUNK_SIZE):
+     """returns the IndexedGraph (vertices labelled 1,...,n) of a DIMACS graph file: comment lines "c ...",
+        the problem line "p edge n m" (or "p col", "p sp", ...), then edges "e v w" (or arcs "a v w ...",
+        read as undirected edges). Repeated edges are merged and self loops dropped"""
+     no_of_vertices = None
+     with open(path) as f:
+          for line in f:
+               tokens = line.split()
+               if tokens and tokens[0] == "p":
+                    assert(len(tokens) >= 4), f"DIMACS problem line {line!r} should be p <format> <n> <m>"
+                    no_of_vertices = int(tokens[2])
+                    break
+               assert(not tokens or tokens[0] == "c"), f"DIMACS line {line!r} before the problem line"
+     assert(no_of_vertices is not None), "DIMACS file has no problem line"
+
+     def pairs(lines):
+          for line in lines:
+               if line[0] in "ea":
+                    tokens = line.split()
+                    yield int(tokens[1]), int(tokens[2])
+
+     return _read_1_based(path, no_of_vertices, pairs, chunk_size)
+
+
+def read_matrix_market(path, chunk_size = CHUNK_SIZE):
+     """returns the IndexedGraph (vertices labelled 1,...,n) of a Matrix Market coordinate file, read as an
+        adjacency matrix: entry (i, j) is an edge unless its value is 0. general and symmetric matrices are
+        both read as undirected graphs (i.e. symmetrised); the diagonal is ignored"""
+     with open(path) as f:
+          header = f.readline().split()
+          assert(len(header) >= 5 and header[0].lower() == "%%matrixmarket" and header[1].lower() == "matrix"
+                 and header[2].lower() == "coordinate"), "not a Matrix Market coordinate file"
+          has_values = header[3].lower() != "pattern"
+          #the entries follow the size line "rows columns entries"
+          skip = 1
+          for line in f:
+               skip += 1
+               if line.strip() and line[0] != "%":
+                    no_of_rows, no_of_columns, no_of_entries = map(int, line.split()[:3])
+                    break
+          else:
+               raise AssertionError("Matrix Market file has no size line")
+     assert(no_of_rows == no_of_columns), "adjacency matrix must be square"
+
+     def pairs(lines):
+          for line in lines:
+               tokens = line.split()
+               if not tokens or line[0] == "%" or (has_values and float(tokens[2]) == 0):
+                    continue
+               yield int(tokens[0]), int(tokens[1])
+
+     return _read_1_based(path, no_of_rows, pairs, chunk_size, skip)
+
+
+def read_npz(path, chunk_size = CHUNK_SIZE):
+     """returns the IndexedGraph of a NumPy .npz file holding a CSR adjacency matrix: the arrays indptr and
+        indices (e.g. from scipy.sparse.save_npz, or numpy.savez), and optionally labels. Either triangle
+        of the symmetric matrix is enough; as in read_matrix_market, explicit zeros in data are not edges"""
+     assert(np is not None), "reading .npz files requires numpy"
+     with np.load(path, allow_pickle = False) as npz:
+          assert("indptr" in npz and "indices" in npz), f"{path} has no CSR indptr and indices arrays"
+          if "format" in npz:
+               assert(npz["format"].item() in ("csr", b"csr")), "only CSR .npz matrices are supported"
+          indptr, indices = npz["indptr"], npz["indices"]
+          labels = npz["labels"].tolist() if "labels" in npz else None
+          if "data" in npz and not npz["data"].all():
+               #drops the explicit zeros, counting the entries left in each row
+               is_edge = npz["data"] != 0
+               rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+               indptr = np.concatenate(([0], np.cumsum(np.bincount(rows[is_edge], minlength = len(indptr) - 1))))
+               indices = indices[is_edge]
+          return IndexedGraph.from_csr(indptr.tolist(), indices.tolist(), labels)
+
+
+READERS = {
+     ".npz": read_npz,
+     ".mtx": read_matrix_market,
+     ".dimacs": read_dimacs,
+     ".col": read_dimacs,
+     ".gr": read_dimacs,
+}
+
+
+def graph_format(path):
+     """returns the format read_graph reads path as: "saved" (a file written by save_graph), the extension
+        of one of READERS, or "edge_list" for any other file"""
+     with open(path, "rb") as f:
+          if f.read(len(MAGIC)) == MAGIC:
+               return "saved"
+     for extension in READERS:
+          if path.lower().endswith(extension):
+               return extension
+     return "edge_list"
+
+
+def read_graph(path, chunk_size = CHUNK_SIZE, cache = None):
+     """returns the IndexedGraph of the file path, read as NumPy CSR (.npz), Matrix Market (.mtx), DIMACS
+        (.dimacs, .col, .gr), a file written by save_graph or else as an edge list of integer vertices.
+        If cache (a path) is given, the graph is loaded from it when it is newer than path, and otherwise
+        saved to it after reading path"""
+     if cache is not None and os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(path):
+          return load_graph(cache)
+     file_format = graph_format(path)
+     if file_format == "saved":
+          return load_graph(path)
+     if file_format == "edge_list":
+          graph = read_edge_list(path, chunk_size = chunk_size)
+     else:
+          graph = READERS[file_format](path, chunk_size = chunk_size)
+     if cache is not None:
+          save_graph(graph, cache)
+     return graph
+
+
+def _aligned(offset):
+     return (offset + 7)//8*8
+
+
+def _write_values(f, values, typecode):
+     #writes values (an array, a numpy array, a memoryview or a list of ints) as little-endian typecode
+     for start in range(0, len(values), CHUNK_SIZE):
+          chunk = array(typecode, values[start:start + CHUNK_SIZE])
+          if sys.byteorder != "little":
+               chunk.byteswap()
+          chunk.tofile(f)
+
+
+def save_graph(graph, path):
+     """writes the IndexedGraph graph to path in the binary format of load_graph. Labels are stored as
+        a range, as an int64 table if they are all integers, or else as JSON (strings, numbers, ...)"""
+     no_of_vertices = len(graph)
+     labels = graph.labels
+     header = {"no_of_vertices": no_of_vertices, "no_of_entries": len(graph.indices),
+               "indptr_offset": 0, "indices_offset": 8*(no_of_vertices + 1)}
+     labels_offset = _aligned(header["indices_offset"] + 4*len(graph.indices))
+     if isinstance(labels, range):
+          header["labels"] = {"format": "range", "start": labels.start, "step": labels.step}
+          label_bytes = None
+     elif all((type(label) is int or (np is not None and isinstance(label, np.integer))) and -2**63 <= label < 2**63
+              for label in labels):
+          header["labels"] = {"format": "int64", "offset": labels_offset}
+          label_bytes = None
+     else:
+          label_bytes = json.dumps(list(labels)).encode()
+          header["labels"] = {"format": "json", "offset": labels_offset, "length": len(label_bytes)}
+     header = json.dumps(header).encode()
+
+     with open(path, "wb") as f:
+          f.write(MAGIC + len(header).to_bytes(8, "little") + header)
+          f.write(bytes(_aligned(f.tell()) - f.tell()))
+          _write_values(f, graph.indptr, 'q')
+          _write_values(f, graph.indices, 'i')
+          f.write(bytes(_aligned(f.tell()) - f.tell()))
+          if label_bytes is not None:
+               f.write(label_bytes)
+          elif not isinstance(labels, range):
+               _write_values(f, labels, 'q')
+
+
+def load_graph(path, use_numpy = False):
+     """returns the IndexedGraph saved at path by save_graph, with its indptr, indices (and integer labels)
+        mapped from the file rather than read: memoryviews of an mmap, or numpy.memmap arrays if use_numpy.
+        The pure Python engines run at the same speed on memoryviews as on arrays (and about twice slower
+        on numpy arrays); the file must not be changed while the graph is in use"""
+     with open(path, "rb") as f:
+          assert(f.read(len(MAGIC)) == MAGIC), f"{path} is not a graph saved by save_graph"
+          header_length = int.from_bytes(f.read(8), "little")
+          header = json.loads(f.read(header_length))
+          data_start = _aligned(len(MAGIC) + 8 + header_length)
+          no_of_vertices = header["no_of_vertices"]
+          label_format = header["labels"]["format"]
+          if label_format == "json":
+               f.seek(data_start + header["labels"]["offset"])
+               labels = json.loads(f.read(header["labels"]["length"]))
+          elif label_format == "range":
+               start, step = header["labels"]["start"], header["labels"]["step"]
+               labels = range(start, start + step*no_of_vertices, step)
+
+          sections = [("indptr_offset", no_of_vertices + 1, 'q', "<i8"), ("indices_offset", header["no_of_entries"], 'i', "<i4")]
+          if label_format == "int64":
+               sections.append((None, no_of_vertices, 'q', "<i8"))
+          if use_numpy:
+               assert(np is not None), "use_numpy requires numpy"
+               arrays = [np.memmap(f, dtype = dtype, mode = "r", shape = (length,),
+                                   offset = data_start + (header[key] if key else header["labels"]["offset"]))
+                         for key, length, typecode, dtype in sections]
+          else:
+               buffer = memoryview(mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ))
+               arrays = []
+               for key, length, typecode, dtype in sections:
+                    offset = data_start + (header[key] if key else header["labels"]["offset"])
+                    values = buffer[offset:offset + length*(8 if typecode == 'q' else 4)].cast(typecode)
+                    if sys.byteorder != "little":
+                         #the file is little-endian: copy and swap
+                         values = array(typecode, values)
+                         values.byteswap()
+                    arrays.append(values)
+     if label_format == "int64":
+          labels = arrays[2]
+     return IndexedGraph(arrays[0], arrays[1], labels)
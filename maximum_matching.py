@@ -1,10 +1,19 @@
 #!/usr/bin/env python
 
 
+from array import array
 from collections import defaultdict, deque
-from time import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from time import perf_counter, time
+import json
 import pprint
 
+try:
+     import numpy as np
+except ImportError:
+     np = None
+
 
 class Forest:
      def __init__(self):
@@ -69,7 +78,35 @@ class Forest:
           if stem:
                has_stem = True
           return (stem, blossom_vertices, blossom_cycle, least_common_ancestor, has_stem)
-     
+
+     def reset(self):
+          self.rootnodes.clear()
+          self.allnodes.clear()
+          self.parentdict.clear()
+          self.rootdict.clear()
+
+
+class SearchState:
+     """reusable bookkeeping of the reference find_aug_path: the Forest, the vertex labels (depths) and, for
+        every even vertex, a cursor into its adjacency list (the number of neighbours scanned so far).
+        Nothing is stored per edge: the matched edge of v is read from matchdict, and any other edge
+        is scanned once, since an edge between two even vertices ends the search (augmenting path or
+        blossom) and an edge to an odd vertex needs nothing.
+        Pass the same state to successive searches to reuse its dictionaries."""
+
+     def __init__(self):
+          self.forest = Forest()
+          self.vertex_label = {}
+          self.cursor = {}
+
+     def reset(self):
+          self.forest.reset()
+          self.vertex_label.clear()
+          self.cursor.clear()
+
+     def edges_scanned(self):
+          return sum(self.cursor.values())
+
 
 class Matching:
     #match_dict = {v: match[v] for all v in vertex_list}
@@ -87,6 +124,8 @@ class Matching:
     
          self.cardinality = (cardinality//2)
          self.matchdict = match_dict
+         #upper bound on the maximum cardinality, set by find_max_matching
+         self.upper_bound = None
          
          
          
@@ -137,6 +176,97 @@ class Matching:
          self.matchedvertices.add(aug_path[-1][1])
          self.cardinality += 1
 
+class SolverStats:
+     """opt-in instrumentation of a solve: pass stats = SolverStats(...) to the run_blossoms_algorithm*
+        and solve_* functions or to an engine (with the default stats = None, the only cost is one test
+        per scanned vertex).
+        counters: searches, augmentations, edges_scanned, blossoms, and for the reference engine
+        max_nesting_depth and quotient_vertices (summed over the quotient graphs).
+        timings: seconds per phase (build_graph, two_colouring, initial_matching, augment, output, ...), and
+        the time of the searches (within augment and certificate) split into forest_growth,
+        blossom_contraction and path_expansion (building the augmenting paths found; for hopcroft_karp,
+        the DFS along the layers).
+        Every event is a dictionary {"event": name, ...} passed to callback and written as a JSON line
+        to jsonl_file (a path, appended to, or an open file):
+        "phase" (name, seconds), "search" (engine, edges_scanned, blossoms, paths, seconds,
+        contraction_seconds, expansion_seconds, and max_depth for the reference engine) and "blossom"
+        (reference engine: depth, blossom_size, quotient_size)."""
+
+     def __init__(self, callback = None, jsonl_file = None):
+          self.counters = defaultdict(int)
+          self.timings = defaultdict(float)
+          self.callback = callback
+          if isinstance(jsonl_file, str):
+               jsonl_file = open(jsonl_file, "a")
+               self._owns_file = True
+          else:
+               self._owns_file = False
+          self.jsonl_file = jsonl_file
+
+     def __enter__(self):
+          return self
+
+     def __exit__(self, *exc_info):
+          self.close()
+
+     def close(self):
+          if self._owns_file:
+               self.jsonl_file.close()
+               self._owns_file = False
+
+     def count(self, name, k = 1):
+          self.counters[name] += k
+
+     def maximum(self, name, value):
+          self.counters[name] = max(self.counters[name], value)
+
+     def emit(self, event, **fields):
+          record = {"event": event, **fields}
+          if self.callback is not None:
+               self.callback(record)
+          if self.jsonl_file is not None:
+               self.jsonl_file.write(json.dumps(record) + "\n")
+
+     def search(self, engine, edges_scanned, blossoms, paths, start_time, contraction_seconds = 0.0,
+                expansion_seconds = 0.0, **fields):
+          #records one augmenting path search (or one phase of a multi-path engine); the time not spent
+          #contracting blossoms or expanding paths is spent growing the forest
+          seconds = perf_counter() - start_time
+          self.count("searches")
+          self.count("edges_scanned", edges_scanned)
+          self.count("blossoms", blossoms)
+          self.timings["forest_growth"] += seconds - contraction_seconds - expansion_seconds
+          self.timings["blossom_contraction"] += contraction_seconds
+          self.timings["path_expansion"] += expansion_seconds
+          self.emit("search", engine = engine, edges_scanned = edges_scanned, blossoms = blossoms,
+                    paths = paths, seconds = seconds, contraction_seconds = contraction_seconds,
+                    expansion_seconds = expansion_seconds, **fields)
+
+     @contextmanager
+     def phase(self, name):
+          start_time = perf_counter()
+          try:
+               yield
+          finally:
+               seconds = perf_counter() - start_time
+               self.timings[name] += seconds
+               self.emit("phase", name = name, seconds = seconds)
+
+     def summary(self):
+          """returns {"counters": {...}, "timings": {...}}"""
+          return {"counters": dict(self.counters), "timings": dict(self.timings)}
+
+
+@contextmanager
+def _phase(stats, name):
+     #stats.phase(name), or nothing when stats is None
+     if stats is None:
+          yield
+     else:
+          with stats.phase(name):
+               yield
+
+
 def create_quotient(vertices, graph_adj_dict, current_matching, blossom_vertices, least_common_ancestor):
      quotient_vertices = vertices - blossom_vertices
      quotient_vertices.add(least_common_ancestor)
@@ -176,99 +306,326 @@ def find_even_path(node, blossom_cycle):
           return blossom_cycle[count:]
           
   
-def find_aug_path(graph_adjacency_dict, current_matching, vertices):
-        #label vertices with 0 (even), 1 (odd) or None
-        vertex_label = defaultdict(lambda: None)
-        
-        #label matched edges as explored
-        is_explored_edge = defaultdict(lambda: False)
-        for v in vertices:
-            for w in vertices:
-                if (v,w) in current_matching.matchededges:
-                    is_explored_edge[(v,w)] = True
+def find_aug_path(graph_adjacency_dict, current_matching, vertices, roots = None, stats = None, state = None,
+                  max_length = None, deadline = None):
+        #if roots is given, only the unmatched vertices in roots grow trees and the other
+        #unmatched vertices are the possible ends of an augmenting path
+        #state (a SearchState) may be passed to reuse it across searches
+        #with max_length, None is returned as soon as there is no augmenting path of length <= max_length
+        #with deadline (a perf_counter() value), the search stops once the time is up, checked for every
+        #vertex scanned, and is abandoned (None) if the time is up after a blossom contraction
+        my_aug_paths = _find_aug_paths(graph_adjacency_dict, current_matching, vertices, roots, stats, state, False,
+                                       max_length, deadline)
+        return my_aug_paths[0] if my_aug_paths else None
+
+
+def find_aug_paths(graph_adjacency_dict, current_matching, vertices, roots = None, stats = None, state = None,
+                   max_length = None, deadline = None):
+        """multi-path counterpart of find_aug_path: returns a list of vertex-disjoint augmenting paths,
+           collected by growing the same forest on after the first path is found"""
+        return _find_aug_paths(graph_adjacency_dict, current_matching, vertices, roots, stats, state, True, max_length,
+                               deadline)
+
+
+def _find_aug_paths(graph_adjacency_dict, current_matching, vertices, roots, stats, state, multi_path, max_length = None,
+                    deadline = None):
+        #when a blossom is found, the search starts again on the quotient graph, which replaces the graph;
+        #only what is needed to lift a path back through the blossom is kept, on the stack lifts
+        #with max_length, the first forest stops growing at the depth beyond which it cannot find an augmenting
+        #path of length <= max_length. Without any blossom within that depth, finding no path proves there is
+        #none that short; contraction does not preserve path lengths, so after a blossom the search is complete
+        if stats is not None:
+             start_time, edges_scanned, blossoms = perf_counter(), 0, 0
+             contraction_seconds = expansion_seconds = 0.0
+        if state is None:
+             state = SearchState()
+        lifts = []
+        my_aug_paths = []
+        try:
+             while True:
+                  my_aug_paths, bloom, scanned = _grow_forest(graph_adjacency_dict, current_matching, vertices, roots,
+                                                              state, multi_path, max_length, deadline)
+                  if bloom is None:
+                       break
+                  max_length = None
+                  if stats is not None:
+                       contraction_start_time = perf_counter()
+                  #BLOSSOMS!!!!!!!
+                  blossom_vertices, blossom_cycle, least_common_ancestor = bloom
+                  #the stem is not toggled: the blossom keeps the matched edge of
+                  #least_common_ancestor, and the tree its root
+                  stem_vertex = current_matching.matchdict[least_common_ancestor]
+                  vertices, graph_adjacency_dict, current_matching, section = create_quotient(
+                       vertices, graph_adjacency_dict, current_matching, blossom_vertices, least_common_ancestor)
+                  if roots is not None:
+                       roots = (roots - blossom_vertices) | (roots & {least_common_ancestor})
+                  lifts.append((blossom_cycle, least_common_ancestor, stem_vertex, section))
+
+                  if stats is not None:
+                       contraction_seconds += perf_counter() - contraction_start_time
+                       edges_scanned += scanned
+                       blossoms += 1
+                       stats.count("quotient_vertices", len(vertices))
+                       stats.maximum("max_nesting_depth", len(lifts))
+                       stats.emit("blossom", depth = len(lifts), blossom_size = len(blossom_vertices),
+                                  quotient_size = len(vertices))
+                  if deadline is not None and perf_counter() >= deadline:
+                       #out of time: the search is abandoned
+                       my_aug_paths = []
+                       return my_aug_paths
+             if stats is not None:
+                  edges_scanned += scanned
+
+             #lift the paths through the blossoms, innermost (last contracted) first; the paths are
+             #vertex-disjoint, so at most one of them goes through a blossom
+             if stats is not None:
+                  expansion_start_time = perf_counter()
+             while lifts and my_aug_paths:
+                  blossom_cycle, least_common_ancestor, stem_vertex, section = lifts.pop()
+                  my_aug_paths = [_lift_aug_path(my_aug_path, blossom_cycle, least_common_ancestor, stem_vertex, section)
+                                  for my_aug_path in my_aug_paths]
+             if stats is not None:
+                  expansion_seconds = perf_counter() - expansion_start_time
+             return my_aug_paths
+        finally:
+             if stats is not None:
+                  stats.search("reference", edges_scanned, blossoms, len(my_aug_paths), start_time,
+                               contraction_seconds, expansion_seconds, max_depth = blossoms)
+
+
+def _lift_aug_path(quotient_aug_path, blossom_cycle, least_common_ancestor, stem_vertex, section):
+        #returns the augmenting path of the graph before least_common_ancestor's blossom was contracted
+        if least_common_ancestor not in [quotient_aug_path[0][0]] + [y for (x,y) in quotient_aug_path]:
+             return quotient_aug_path
+        #orient the path so that it enters the blossom by an unmatched edge
+        #(and leaves it, if at all, by the matched edge of least_common_ancestor)
+        if (quotient_aug_path[0][0] == least_common_ancestor or
+            (quotient_aug_path[-1][1] != least_common_ancestor and
+             (stem_vertex, least_common_ancestor) in quotient_aug_path)):
+             quotient_aug_path = [(y,x) for (x,y) in reversed(quotient_aug_path)]
+
+        #replace the edge (v, least_common_ancestor) by an edge into the blossom
+        #and the even path from there to least_common_ancestor
+        pos = [y for (x,y) in quotient_aug_path].index(least_common_ancestor)
+        v = quotient_aug_path[pos][0]
+        attaching_point_to_bloom = section[(v,least_common_ancestor)][1]
+        return (quotient_aug_path[:pos] + [(v,attaching_point_to_bloom)] +
+                find_even_path(attaching_point_to_bloom, blossom_cycle) +
+                quotient_aug_path[pos+1:])
+
+
+def _grow_forest(graph_adjacency_dict, current_matching, vertices, roots, state, multi_path = False, max_length = None,
+                 deadline = None):
+        #grows an alternating forest from the unmatched vertices of roots (all of vertices if roots is None)
+        #returns ([augmenting path], None, edges scanned), ([], (blossom_vertices, blossom_cycle,
+        #least_common_ancestor), edges scanned) for the first blossom found, or ([], None, edges scanned)
+        #with multi_path, the trees joined by an augmenting path are retired and the others keep growing;
+        #the vertex-disjoint augmenting paths found are returned, and once there is one, a blossom only
+        #retires its tree (it is contracted by a later search)
+        #with max_length, the even vertices deeper than max_length/2 are not scanned: the vertices are
+        #explored in order of depth, and an augmenting path of length <= max_length would have been met
+        #as an edge between two even vertices of depth <= max_length/2 (the two halves of the path) by then
+        #with deadline, the forest stops growing once the time is up
+        state.reset()
+        F = state.forest
+        #label vertices with their depth in the forest: even or odd
+        vertex_label = state.vertex_label
+        cursor = state.cursor
+        matchdict = current_matching.matchdict
+        my_aug_paths = []
+        #roots of the retired trees, and the unmatched vertices outside the forest ending a path
+        retired = set()
 
         #create a forest with trees (just roots) of unmatched vertices
         #create a queue of to_be_explored vertices
         #If v in the  queue, v will be even labelled
         to_be_explored_nodes = deque()
-        F = Forest()
-        for u in vertices  - current_matching.matchedvertices:
+        if roots is None:
+            roots = vertices
+        for u in roots - current_matching.matchedvertices:
             vertex_label[u] = 0
             F.add_root(u)
+            cursor[u] = 0
             to_be_explored_nodes.append(u)
        
 
         while to_be_explored_nodes:
+             if deadline is not None and perf_counter() >= deadline:
+                  break
              v = to_be_explored_nodes.popleft()
-             for w in graph_adjacency_dict[v]:
-                  if is_explored_edge[(v,w)] is False:
-                       if w not in F.allnodes:
-                            vertex_label[w] = 1
-                            F.add_edge(v, w)
-                            x = current_matching.matchdict[w]
-                            vertex_label[x] = 0
-                            F.add_edge(w, x)
-                            to_be_explored_nodes.append(x)
-                            is_explored_edge[(w,x)] = True
-                            is_explored_edge[(x,w)] = True
+             if max_length is not None and 2*vertex_label[v] > max_length:
+                  break
+             if F.rootdict[v] in retired:
+                  continue
+             neighbours = graph_adjacency_dict[v]
+             while cursor[v] < len(neighbours):
+                  w = neighbours[cursor[v]]
+                  cursor[v] += 1
+                  if w == matchdict[v]:
+                       #the matched edge of v, by which v joined the forest
+                       continue
+                  if w not in F.allnodes and matchdict[w] is None:
+                       #unmatched vertex which is not a root
+                       if w in retired:
+                            continue
+                       my_aug_path = []
+                       for edge in reversed(F.path_to_root(v)):
+                            my_aug_path.append((edge[1], edge[0]))
+                       my_aug_path.append((v,w))
+                       my_aug_paths.append(my_aug_path)
+                       if not multi_path:
+                            return my_aug_paths, None, state.edges_scanned()
+                       retired.update((F.rootdict[v], w))
+                       break
+                  elif w not in F.allnodes:
+                       vertex_label[w] = vertex_label[v] + 1
+                       F.add_edge(v, w)
+                       x = matchdict[w]
+                       vertex_label[x] = vertex_label[v] + 2
+                       F.add_edge(w, x)
+                       cursor[x] = 0
+                       to_be_explored_nodes.append(x)
 
+                  elif vertex_label[w] % 2 == 0 and F.rootdict[w] not in retired:
+                       if F.rootdict[w] != F.rootdict[v]:
+                            my_aug_path = []
+                            for edge in reversed(F.path_to_root(v)):
+                                 my_aug_path.append((edge[1], edge[0]))
+                            my_aug_path.append((v,w))
+                            my_aug_path.extend(F.path_to_root(w))
+                            my_aug_paths.append(my_aug_path)
+                            if not multi_path:
+                                 return my_aug_paths, None, state.edges_scanned()
+                            retired.update((F.rootdict[v], F.rootdict[w]))
+                            break
+                       elif my_aug_paths:
+                            retired.add(F.rootdict[v])
+                            break
                        else:
-                            if (vertex_label[w] % 2) == 0:
-                                 if F.rootdict[w] != F.rootdict[v]:
-                                      my_aug_path = []
-                                      for edge in reversed(F.path_to_root(v)):
-                                           my_aug_path.append((edge[1], edge[0]))
-                                      my_aug_path.append((v,w))
-                                      my_aug_path.extend(F.path_to_root(w))
-                                      return my_aug_path
-                                 else:
-                                      #BLOSSOMS!!!!!!!
-                                      (stem, blossom_vertices, blossom_cycle, least_common_ancestor, has_stem) = F.bloom(v,w)
-                                      if has_stem:
-                                           #toggle_stem
-                                           current_matching.xor_even_path(stem)                                      
-                                      quotient_vertices, quotient_graph_adjacency_dict, quotient_matching, section = (
-                                           create_quotient(
-                                                vertices, graph_adjacency_dict, current_matching,
-                                                blossom_vertices, least_common_ancestor))
-                                      
-                                      quotient_aug_path = find_aug_path(quotient_graph_adjacency_dict,
-                                                                        quotient_matching, quotient_vertices)
-                                      
-                                      if not quotient_aug_path:
-                                           return quotient_aug_path
-                                      elif (quotient_aug_path[0][0] != least_common_ancestor and
-                                           quotient_aug_path[-1][1] != least_common_ancestor):
-                                           return quotient_aug_path
-                                      else:
-                                           if quotient_aug_path[0][0] == least_common_ancestor:
-                                                quotient_aug_path = list(reversed(quotient_aug_path))
-                                                for pos, (x,y) in  enumerate(quotient_aug_path):
-                                                     quotient_aug_path[pos] = (y,x)
-                                                     
-                                           #So quotient_aug_path[-1][1] = least_common_ancestor:
-                                           v = quotient_aug_path[-1][0]
-                                           quotient_aug_path.pop()
-                                           attaching_point_to_bloom = section[(v,least_common_ancestor)][1]
-                                           quotient_aug_path.append((v,attaching_point_to_bloom))
-                                           quotient_aug_path.extend(find_even_path(attaching_point_to_bloom, blossom_cycle))
-                                           return quotient_aug_path
-
-
-                  is_explored_edge[(v,w)] = True
-                  is_explored_edge[(w,v)] = True
+                            (stem, blossom_vertices, blossom_cycle, least_common_ancestor, has_stem) = F.bloom(v,w)
+                            return my_aug_paths, (blossom_vertices, blossom_cycle, least_common_ancestor), state.edges_scanned()
+
+        return my_aug_paths, None, state.edges_scanned()
 
 
 
      
-def find_max_matching(graph_adjacency_dict, current_matching, vertices):
-        my_path = find_aug_path(graph_adjacency_dict, current_matching, vertices)
-        if not my_path:
-            return current_matching.matchdict, current_matching.cardinality
+def find_max_matching(graph_adjacency_dict, current_matching, vertices, stats = None, multi_path = False,
+                      approximate = None, deadline = None, time_budget = None):
+        #one search per iteration, until there is no augmenting path; with multi_path, each search
+        #returns every vertex-disjoint augmenting path its forest finds, and they are all applied
+        #returns (match_dict, cardinality) and sets current_matching.upper_bound to an upper bound on the
+        #maximum cardinality: the cardinality itself once there is no augmenting path
+        #approximate = k stops once there is no augmenting path of length <= 2k+1: the symmetric difference
+        #with a maximum matching then consists of augmenting paths with at least k+1 matched edges each, so
+        #that the maximum is at most cardinality*(k+2)/(k+1) (a ratio of (k+1)/(k+2), at least k/(k+1))
+        #deadline (a perf_counter() value) or time_budget (in seconds) stops augmenting once the time is up,
+        #checked between searches and after each blossom contraction; the upper bound is then
+        #matching_upper_bound, which is computed first so that its cost counts against the time budget
+        state = SearchState()
+        max_length = None if approximate is None else 2*approximate + 1
+        if time_budget is not None:
+             deadline = perf_counter() + time_budget if deadline is None else min(deadline, perf_counter() + time_budget)
+        if deadline is not None or approximate is not None:
+             upper_bound = matching_upper_bound(graph_adjacency_dict, vertices, deadline)
+        while deadline is None or perf_counter() < deadline:
+             if multi_path:
+                  my_paths = find_aug_paths(graph_adjacency_dict, current_matching, vertices, stats = stats, state = state,
+                                            max_length = max_length, deadline = deadline)
+             else:
+                  my_path = find_aug_path(graph_adjacency_dict, current_matching, vertices, stats = stats, state = state,
+                                          max_length = max_length, deadline = deadline)
+                  my_paths = [my_path] if my_path else []
+             if not my_paths:
+                  break
+             for my_path in my_paths:
+                  current_matching.xor_aug_path(my_path)
+             if stats is not None:
+                  stats.count("augmentations", len(my_paths))
+
+        cardinality = current_matching.cardinality
+        if deadline is not None and perf_counter() >= deadline:
+             #the last search may have been cut short
+             current_matching.upper_bound = upper_bound
+        elif approximate is not None:
+             current_matching.upper_bound = min(cardinality*(approximate + 2)//(approximate + 1), upper_bound)
         else:
-            current_matching.xor_aug_path(my_path)
-            return find_max_matching(graph_adjacency_dict, current_matching, vertices)
-     
+             current_matching.upper_bound = cardinality
+        return current_matching.matchdict, cardinality
+
+
+def matching_upper_bound(graph_adjacency_dict, vertices, deadline = None):
+     """dict counterpart of matching_upper_bound_indexed, given vertices(set) and graph_adjacency_dict"""
+     graph = IndexedGraph.from_edges(((v, w) for v in vertices for w in graph_adjacency_dict[v] if w in vertices),
+                                     list(vertices))
+     return matching_upper_bound_indexed(graph, deadline)
+
+
+def _undirected_neighbours(graph_adjacency_dict, vertices):
+     #the edges between vertices, without self loops and in both directions
+     neighbours = {v: set() for v in vertices}
+     for v in vertices:
+          for w in graph_adjacency_dict.get(v, ()):
+               if w != v and w in neighbours:
+                    neighbours[v].add(w)
+                    neighbours[w].add(v)
+     return neighbours
+
+
+def gallai_edmonds_decomposition(graph_adjacency_dict, match_dict, vertices):
+     """returns a certificate that match_dict is a maximum matching: its Gallai-Edmonds decomposition, as a dict
+        labelling the vertices EVEN (missed by some maximum matching), ODD (the other neighbours of the EVEN
+        vertices, each matched to one) or UNLABELLED (the rest, matched among themselves). These are the
+        labels of the final forest of find_aug_paths_indexed, which no longer finds an augmenting path; None
+        is returned if there is one. The solvers return the certificate with the matching, see MatchingResult"""
+     vertex_set = set(vertices)
+     graph = IndexedGraph.from_edges(((v, w) for v in vertex_set for w in graph_adjacency_dict[v] if w in vertex_set),
+                                     list(vertex_set))
+     current_matching = IndexedMatching.from_warm_start(match_dict, graph)
+     if find_aug_paths_indexed(graph, current_matching):
+          return None
+     return dict(zip(graph.labels, current_matching.certificate))
+
+
+def verify_max_matching(graph_adjacency_dict, match_dict, certificate):
+     """checks in O(V+E) that match_dict is a maximum matching of the graph, given the certificate of
+        gallai_edmonds_decomposition: both must cover every vertex of the graph (every key and neighbour of
+        graph_adjacency_dict), match_dict must be a matching, and the set A of ODD vertices a Tutte-Berge
+        witness, i.e. 2 * cardinality = |V| + |A| - (the number of odd components of the graph without A).
+        Returns True or False"""
+     vertices = set(graph_adjacency_dict)
+     for v in graph_adjacency_dict:
+          vertices.update(graph_adjacency_dict[v])
+     if set(certificate) != vertices or set(match_dict) != vertices:
+          return False
+     neighbours = _undirected_neighbours(graph_adjacency_dict, vertices)
+     cardinality = 0
+     for v, w in match_dict.items():
+          if w is not None:
+               if w not in neighbours[v] or match_dict[w] != v:
+                    return False
+               cardinality += 1
+     cardinality //= 2
+
+     odd_vertices = [v for v in vertices if certificate[v] == ODD]
+     seen = set(odd_vertices)
+     odd_components = 0
+     for source in vertices:
+          if source in seen:
+               continue
+          seen.add(source)
+          size, stack = 0, [source]
+          while stack:
+               v = stack.pop()
+               size += 1
+               for w in neighbours[v]:
+                    if w not in seen:
+                         seen.add(w)
+                         stack.append(w)
+          odd_components += size % 2
+     return 2*cardinality == len(vertices) + len(odd_vertices) - odd_components
+
+
 def find_a_maximal_matching(graph_adjacency_dict,vertices):
      """returns a maximal matching given vertices(set) and graph_adjacency_dict"""
      
@@ -292,6 +649,9 @@ def find_a_maximal_matching(graph_adjacency_dict,vertices):
 def create_graph_adjacency_dict(adjacency_matrix, list_of_vertices):
      """returns the graph adjacency dictionary given the adjacency matrix, list_of_vertices"""
      assert(len(adjacency_matrix) == len(list_of_vertices)), "no_of_vertices not compatible with adjacency matrix row dimension"
+     if np is not None:
+          return create_graph_adjacency_dict_from_array(adjacency_matrix, list_of_vertices, check_entries = False)
+
      n = len(list_of_vertices)
      graph_adjacency_dict = defaultdict(list)
      for i in range(n):
@@ -305,33 +665,1415 @@ def create_graph_adjacency_dict(adjacency_matrix, list_of_vertices):
      return graph_adjacency_dict
 
 
+def check_adjacency_array(adjacency_array, check_entries = True):
+     """asserts that adjacency_array (a square numpy array) is symmetric and, if check_entries,
+        that it has 0/1 entries and no self loops; returns the boolean edge mask"""
+     is_edge = (adjacency_array == 1)
+     if check_entries:
+          assert(not adjacency_array.diagonal().any()), "adjacency matrix has self loops"
+          assert((is_edge | (adjacency_array == 0)).all()), "adjacency matrix entries must be 0 or 1"
+          #with 0/1 entries, symmetry of the edge mask is symmetry of the matrix
+          assert((is_edge == is_edge.T).all()), "adjacency matrix is not symmetric"
+     else:
+          assert((adjacency_array == adjacency_array.T).all()), "adjacency matrix is not symmetric"
+     return is_edge
 
-               
-     
-     
-def run_blossoms_algorithm(adjacency_matrix, list_of_vertices = None):
-     start_time = time()
-     
+
+def adjacency_array_to_csr(adjacency_matrix, list_of_vertices = None, check_entries = True):
+     """returns (indptr, indices, list_of_vertices), the CSR form of an adjacency matrix given as a
+        numpy array (or anything array-like), validating it with whole-array operations (needs numpy)"""
+     assert(np is not None), "numpy is required for array input"
      no_of_vertices = len(adjacency_matrix)
      if list_of_vertices is None:
           list_of_vertices = list(range(no_of_vertices))
-
-          
-     #ensuring matrix dimensions are compatible with list of_vertices
      assert(no_of_vertices == len(list_of_vertices)), "no_of_vertices not compatible with adjacency matrix row dimension"
-     assert(all([no_of_vertices == len(row) for row in adjacency_matrix])), "no_of_vertices not compatible with adjacency matrix col dimension"
-     
-          
-     #Create graph_adjacency_dict
-     graph_adjacency_dict =  create_graph_adjacency_dict(adjacency_matrix, list_of_vertices)
-     vertices = set(list_of_vertices)
+     if not isinstance(adjacency_matrix, np.ndarray):
+          assert(all([no_of_vertices == len(row) for row in adjacency_matrix])), "no_of_vertices not compatible with adjacency matrix col dimension"
+     adjacency_array = np.asarray(adjacency_matrix)
+     assert(adjacency_array.shape == (no_of_vertices, no_of_vertices)), "adjacency matrix is not square"
+
+     #validate and find the edges from one boolean mask;
+     #nonzero returns the edges row by row, so each row is a contiguous slice
+     is_edge = check_adjacency_array(adjacency_array, check_entries)
+     rows, cols = np.nonzero(is_edge)
+     indptr = np.zeros(no_of_vertices + 1, dtype = np.int64)
+     np.cumsum(np.bincount(rows, minlength = no_of_vertices), out = indptr[1:])
+     return indptr, cols, list_of_vertices
+
+
+def create_graph_adjacency_dict_from_array(adjacency_matrix, list_of_vertices = None, check_entries = True):
+     """returns the graph adjacency dictionary given an adjacency matrix as a numpy array
+        (or anything array-like), validating it with whole-array operations (needs numpy)"""
+     indptr, cols, list_of_vertices = adjacency_array_to_csr(adjacency_matrix, list_of_vertices, check_entries)
+     no_of_vertices = len(list_of_vertices)
+     indptr = indptr.tolist()
+     cols = cols.tolist()
+
+     graph_adjacency_dict = defaultdict(list)
+     is_identity_labelling = (list(list_of_vertices) == list(range(no_of_vertices)))
+     for i in range(no_of_vertices):
+          if is_identity_labelling:
+               graph_adjacency_dict[i] = cols[indptr[i]:indptr[i+1]]
+          else:
+               graph_adjacency_dict[list_of_vertices[i]] = [list_of_vertices[j] for j in cols[indptr[i]:indptr[i+1]]]
+     return graph_adjacency_dict
+
+
+def create_graph_adjacency_dict_from_edges(edge_list, list_of_vertices = None):
+     """returns the graph adjacency dictionary and the set of vertices given an edge list
+        (and optionally the list_of_vertices, to include isolated vertices)"""
+     #Each undirected edge may be listed once or in both directions; self loops
+     #can never be matched and repeated edges are redundant, so both are dropped.
+     graph_adjacency_dict = defaultdict(list)
+     if list_of_vertices is not None:
+          for v in list_of_vertices:
+               graph_adjacency_dict[v].extend([])
+     for v, w in edge_list:
+          if v != w:
+               graph_adjacency_dict[v].append(w)
+               graph_adjacency_dict[w].append(v)
+     for v in graph_adjacency_dict:
+          if len(graph_adjacency_dict[v]) > 1:
+               graph_adjacency_dict[v] = list(dict.fromkeys(graph_adjacency_dict[v]))
+
+     vertices = set(graph_adjacency_dict)
+     if list_of_vertices is not None:
+          assert(vertices == set(list_of_vertices)), "edge list has endpoints outside list_of_vertices"
+     return graph_adjacency_dict, vertices
+
+
+def edges_from_csr(indptr, indices):
+     """yields the (row, column) pairs stored in the CSR arrays indptr, indices"""
+     for i in range(len(indptr) - 1):
+          for k in range(indptr[i], indptr[i+1]):
+               yield (i, indices[k])
+
+
+def create_graph_adjacency_dict_from_csr(indptr, indices, list_of_vertices = None):
+     """returns the graph adjacency dictionary and the set of vertices given CSR arrays indptr, indices
+        (either triangle of a symmetric matrix is enough) and optionally the list_of_vertices"""
+     no_of_vertices = len(indptr) - 1
+     if list_of_vertices is None:
+          list_of_vertices = list(range(no_of_vertices))
+     assert(no_of_vertices == len(list_of_vertices)), "no_of_vertices not compatible with CSR indptr length"
+     assert(len(indices) == indptr[-1]), "CSR indices length not compatible with indptr"
+
+     edge_list = ((list_of_vertices[i], list_of_vertices[j]) for i, j in edges_from_csr(indptr, indices))
+     return create_graph_adjacency_dict_from_edges(edge_list, list_of_vertices)
+
+
+#Integer-indexed core
+#Vertex labels are interned once, at the API boundary, to 0,1,...,n-1 so that the
+#graph, the matching and the forest can be stored in flat arrays instead of
+#sets and dictionaries of labels and edge tuples.
+
+UNMATCHED = -1
+UNLABELLED, EVEN, ODD, HUNGARIAN = -1, 0, 1, 2
+
+
+class IndexedGraph:
+     """undirected graph on the vertices 0,1,...,n-1 stored as CSR arrays (each edge in both directions);
+        labels[v] is the original label of vertex v"""
+     __slots__ = ("indptr", "indices", "labels")
+
+     def __init__(self, indptr, indices, labels = None):
+          self.indptr = indptr
+          self.indices = indices
+          if labels is None:
+               labels = range(len(indptr) - 1)
+          assert(len(labels) == len(indptr) - 1), "no_of_vertices not compatible with CSR indptr length"
+          self.labels = labels
+
+     def __len__(self):
+          return len(self.indptr) - 1
+
+     def __getitem__(self, v):
+          #neighbours of v
+          return self.indices[self.indptr[v]:self.indptr[v+1]]
+
+     def degree(self, v):
+          return self.indptr[v+1] - self.indptr[v]
+
+     def no_of_edges(self):
+          return len(self.indices)//2
+
+     def label_index(self):
+          """returns the dictionary label -> vertex index"""
+          return {label: v for v, label in enumerate(self.labels)}
+
+     def to_adjacency_dict(self):
+          """returns the graph adjacency dictionary (in terms of the labels)"""
+          labels = self.labels
+          graph_adjacency_dict = defaultdict(list)
+          for v in range(len(self)):
+               graph_adjacency_dict[labels[v]] = [labels[w] for w in self[v]]
+          return graph_adjacency_dict
+
+     def induced_subgraph(self, vertices):
+          """returns the subgraph induced by vertices (a list of vertex indices closed under adjacency,
+             e.g. a union of connected components), re-indexed 0,1,...,len(vertices)-1 in the given order"""
+          local_index = {v: i for i, v in enumerate(vertices)}
+          indptr = array('q', [0])
+          indices = array('i')
+          for v in vertices:
+               indices.extend(local_index[w] for w in self[v])
+               indptr.append(len(indices))
+          return IndexedGraph(indptr, indices)
+
+     @classmethod
+     def from_directed_pairs(cls, no_of_vertices, sources, targets, labels = None):
+          """returns the graph whose CSR rows are the given (source, target) index pairs, with repeated
+             pairs and self loops removed; each undirected edge must appear in both directions"""
+          degree = array('q', bytes(8*(no_of_vertices + 1)))
+          for v in sources:
+               degree[v] += 1
+          position = array('q', [0])*(no_of_vertices + 1)
+          for v in range(no_of_vertices):
+               position[v+1] = position[v] + degree[v]
+          scattered = array('i', bytes(4*len(sources)))
+          fill = array('q', position)
+          for v, w in zip(sources, targets):
+               scattered[fill[v]] = w
+               fill[v] += 1
+
+          indptr = array('q', [0])*(no_of_vertices + 1)
+          indices = array('i')
+          for v in range(no_of_vertices):
+               row = scattered[position[v]:position[v+1]]
+               if len(row) > 1:
+                    row = sorted(set(row))
+               indices.extend(w for w in row if w != v)
+               indptr[v+1] = len(indices)
+          return cls(indptr, indices, labels)
+
+     @classmethod
+     def from_edges(cls, edge_list, list_of_vertices = None):
+          """returns the graph given an iterable of (v, w) label pairs (each edge once or in both
+             directions) and optionally the list_of_vertices, to include isolated vertices"""
+          index = {}
+          if list_of_vertices is not None:
+               for v in list_of_vertices:
+                    index.setdefault(v, len(index))
+               no_of_vertices = len(index)
+          sources = array('i')
+          targets = array('i')
+          for v, w in edge_list:
+               i = index.setdefault(v, len(index))
+               j = index.setdefault(w, len(index))
+               sources.append(i)
+               targets.append(j)
+               sources.append(j)
+               targets.append(i)
+          if list_of_vertices is not None:
+               assert(len(index) == no_of_vertices), "edge list has endpoints outside list_of_vertices"
+          return cls.from_directed_pairs(len(index), sources, targets, list(index))
+
+     @classmethod
+     def from_csr(cls, indptr, indices, list_of_vertices = None):
+          """returns the graph given CSR arrays indptr, indices (either triangle of a symmetric matrix is enough)"""
+          no_of_vertices = len(indptr) - 1
+          assert(len(indices) == indptr[-1]), "CSR indices length not compatible with indptr"
+          sources = array('i')
+          targets = array('i')
+          for i, j in edges_from_csr(indptr, indices):
+               sources.append(i)
+               targets.append(j)
+               sources.append(j)
+               targets.append(i)
+          return cls.from_directed_pairs(no_of_vertices, sources, targets, list_of_vertices)
+
+     @classmethod
+     def from_adjacency_matrix(cls, adjacency_matrix, list_of_vertices = None):
+          """returns the graph given the adjacency matrix (a list of lists or an array) and list_of_vertices"""
+          if np is not None:
+               indptr, cols, list_of_vertices = adjacency_array_to_csr(adjacency_matrix, list_of_vertices, check_entries = False)
+               #self loops can never be matched
+               sources = np.repeat(np.arange(len(list_of_vertices)), np.diff(indptr))
+               if (sources == cols).any():
+                    return cls.from_directed_pairs(len(list_of_vertices), array('i', sources.tolist()),
+                                                   array('i', cols.tolist()), list_of_vertices)
+               return cls(array('q', indptr.tolist()), array('i', cols.tolist()), list_of_vertices)
+
+          no_of_vertices = len(adjacency_matrix)
+          if list_of_vertices is None:
+               list_of_vertices = list(range(no_of_vertices))
+          assert(no_of_vertices == len(list_of_vertices)), "no_of_vertices not compatible with adjacency matrix row dimension"
+          indptr = array('q', [0])
+          indices = array('i')
+          for i in range(no_of_vertices):
+               for j in range(no_of_vertices):
+                    assert(adjacency_matrix[i][j] == adjacency_matrix[j][i]), "adjacency matrix is not symmetric"
+                    if adjacency_matrix[i][j] == 1 and i != j:
+                         indices.append(j)
+               indptr.append(len(indices))
+          return cls(indptr, indices, list_of_vertices)
+
+
+class IndexedMatching:
+     """matching on the vertices 0,1,...,n-1: mate[v] is the vertex matched to v, or UNMATCHED.
+        upper_bound is an upper bound on the maximum cardinality set by the solvers (the cardinality itself
+        once the matching is maximum), or None. certificate is set by the searches that prove the matching
+        maximum: certificate[v] is the label EVEN, ODD or UNLABELLED of v in the Gallai-Edmonds
+        decomposition (see gallai_edmonds_decomposition), or certificate is None"""
+     __slots__ = ("mate", "cardinality", "upper_bound", "certificate")
+
+     def __init__(self, no_of_vertices):
+          self.mate = array('i', [UNMATCHED])*no_of_vertices
+          self.cardinality = 0
+          self.upper_bound = None
+          self.certificate = None
+
+     @classmethod
+     def from_match_dict(cls, match_dict, labels):
+          """returns the matching given match_dict = {label: matched label or None} and the vertex labels"""
+          index = {label: v for v, label in enumerate(labels)}
+          matching = cls(len(labels))
+          for v, w in match_dict.items():
+               if w is not None:
+                    matching.mate[index[v]] = index[w]
+          matching.cardinality = sum(1 for w in matching.mate if w != UNMATCHED)//2
+          return matching
+
+     @classmethod
+     def from_warm_start(cls, initial_matching, graph):
+          """returns the part of initial_matching (a match_dict, a Matching, or an IndexedMatching on the
+             vertex indices) that is a legal matching of graph (an IndexedGraph): pairs whose vertices or edge
+             are not in graph, pairs listed on one side only, and vertices matched twice are dropped"""
+          matching = cls(len(graph))
+          mate = matching.mate
+          if isinstance(initial_matching, IndexedMatching):
+               initial_mate = initial_matching.mate
+               pairs = ((v, w) for v, w in enumerate(initial_mate[:len(graph)])
+                        if 0 <= w < len(initial_mate) and initial_mate[w] == v)
+          else:
+               if isinstance(initial_matching, Matching):
+                    initial_matching = initial_matching.matchdict
+               index = graph.label_index()
+               pairs = ((index.get(v), index.get(w)) for v, w in initial_matching.items()
+                        if w is not None and initial_matching.get(w) == v)
+          for v, w in pairs:
+               if v is None or w is None or v >= len(graph) or w >= len(graph):
+                    continue
+               if mate[v] == UNMATCHED and mate[w] == UNMATCHED and w in graph[v]:
+                    mate[v] = w
+                    mate[w] = v
+                    matching.cardinality += 1
+          return matching
+
+     def to_match_dict(self, labels):
+          """returns match_dict = {label: matched label or None}"""
+          return {labels[v]: (labels[w] if w != UNMATCHED else None) for v, w in enumerate(self.mate)}
+
+     def xor_aug_path(self, aug_path):
+          #aug_path = [v_0, v_1, ..., v_n], v_0 and v_n unmatched
+          mate = self.mate
+          for k in range(0, len(aug_path) - 1, 2):
+               v, w = aug_path[k], aug_path[k+1]
+               mate[v] = w
+               mate[w] = v
+          self.cardinality += 1
+          self.certificate = None
+
+
+class IndexedForest:
+     """alternating forest on the vertices 0,1,...,n-1 whose blossoms are contracted in place.
+        Blossoms are sets of a union-find structure over the original vertices (base[rep] is the base
+        of the blossom), so neither the graph nor the matching is ever copied. Following Gabow's
+        implementation of Edmonds' algorithm, an odd vertex that becomes even when a blossom is
+        contracted remembers the edge (bridge_source, bridge_target) that closed the blossom, which
+        is enough to expand the augmenting path that is eventually found.
+        The forest is reusable: reset() clears only the vertices touched by the last search, and
+        vertices of Hungarian trees stay labelled HUNGARIAN for good."""
+     __slots__ = ("parent", "root", "label", "bridge_source", "bridge_target",
+                  "blossom", "blossom_size", "base", "mark", "stamp", "touched")
+
+     def __init__(self, no_of_vertices):
+          self.parent = array('i', [-1])*no_of_vertices
+          self.root = array('i', [-1])*no_of_vertices
+          self.label = array('b', [UNLABELLED])*no_of_vertices
+          self.bridge_source = array('i', [-1])*no_of_vertices
+          self.bridge_target = array('i', [-1])*no_of_vertices
+          self.blossom = array('i', range(no_of_vertices))
+          self.blossom_size = array('i', [1])*no_of_vertices
+          self.base = array('i', range(no_of_vertices))
+          self.mark = array('q', [0])*no_of_vertices
+          self.stamp = 0
+          self.touched = []
+
+     def add_root(self, root):
+          self.root[root] = root
+          self.label[root] = EVEN
+          self.touched.append(root)
+
+     def add_edge(self, beg_node, end_node):
+          #beg_node in forest already
+          #end_node not in forest, labelled with the opposite parity
+          self.parent[end_node] = beg_node
+          self.root[end_node] = self.root[beg_node]
+          self.label[end_node] = 1 - self.label[beg_node]
+          self.touched.append(end_node)
+
+     def reset(self):
+          for v in self.touched:
+               self.parent[v] = -1
+               self.root[v] = -1
+               self.label[v] = UNLABELLED
+               self.bridge_source[v] = -1
+               self.bridge_target[v] = -1
+               self.blossom[v] = v
+               self.blossom_size[v] = 1
+               self.base[v] = v
+          self.touched = []
+
+     def prune(self):
+          #the trees grown since the last reset are Hungarian: no augmenting path can ever visit them
+          for v in self.touched:
+               self.label[v] = HUNGARIAN
+          self.touched = []
+
+     def gallai_edmonds_labels(self, mate):
+          """returns the labels EVEN, ODD or UNLABELLED of the vertices in the Gallai-Edmonds decomposition,
+             given that the forest was grown from every unmatched vertex without finding an augmenting path:
+             the vertices of blossoms are EVEN like their base, and so are the isolated unmatched vertices.
+             A HUNGARIAN vertex is EVEN if it is a root, was reached through its mate or made even by a blossom"""
+          labels = array('b', self.label)
+          parent, bridge_source = self.parent, self.bridge_source
+          for v in range(len(labels)):
+               if labels[v] == HUNGARIAN:
+                    if parent[v] == -1 or parent[v] == mate[v] or bridge_source[v] != -1:
+                         labels[v] = EVEN
+                    else:
+                         labels[v] = ODD
+               elif labels[v] == UNLABELLED and mate[v] == UNMATCHED:
+                    labels[v] = EVEN
+          return labels
+
+     def base_of(self, node):
+          """returns the base of the (contracted) blossom containing node"""
+          blossom = self.blossom
+          while blossom[node] != node:
+               blossom[node] = blossom[blossom[node]]
+               node = blossom[node]
+          return self.base[node]
+
+     def _merge(self, node, base):
+          #merges the blossom of node into the blossom whose base is base
+          blossom, blossom_size = self.blossom, self.blossom_size
+          rep_1, rep_2 = node, base
+          while blossom[rep_1] != rep_1:
+               rep_1 = blossom[rep_1]
+          while blossom[rep_2] != rep_2:
+               rep_2 = blossom[rep_2]
+          if rep_1 == rep_2:
+               return
+          if blossom_size[rep_1] > blossom_size[rep_2]:
+               rep_1, rep_2 = rep_2, rep_1
+          blossom[rep_1] = rep_2
+          blossom_size[rep_2] += blossom_size[rep_1]
+          self.base[rep_2] = base
+
+     def _parent_base(self, base, mate):
+          #base of the blossom above the blossom with base base, or -1 at the root
+          if mate[base] == UNMATCHED:
+               return -1
+          return self.base_of(self.parent[mate[base]])
+
+     def least_common_ancestor(self, node_1, node_2, mate):
+          """returns the base of the blossom closed by the edge node_1 - node_2 (even nodes of the same tree)"""
+          #step up from both sides in turn, so the cost is proportional to the new blossom
+          self.stamp += 1
+          stamp, mark = self.stamp, self.mark
+          base_1, base_2 = self.base_of(node_1), self.base_of(node_2)
+          while True:
+               if base_1 != -1:
+                    if mark[base_1] == stamp:
+                         return base_1
+                    mark[base_1] = stamp
+                    base_1 = self._parent_base(base_1, mate)
+               base_1, base_2 = base_2, base_1
+
+     def bloom(self, node_1, node_2, mate):
+          """contracts the blossom closed by the edge node_1 - node_2 (even nodes of the same tree)
+             and returns its formerly odd vertices, which are now even"""
+          least_common_ancestor = self.least_common_ancestor(node_1, node_2, mate)
+          newly_even_nodes = []
+          for source, target in ((node_1, node_2), (node_2, node_1)):
+               base = self.base_of(source)
+               while base != least_common_ancestor:
+                    odd_node = mate[base]
+                    self.label[odd_node] = EVEN
+                    self.bridge_source[odd_node] = source
+                    self.bridge_target[odd_node] = target
+                    newly_even_nodes.append(odd_node)
+                    next_base = self.base_of(self.parent[odd_node])
+                    self._merge(base, least_common_ancestor)
+                    self._merge(odd_node, least_common_ancestor)
+                    base = next_base
+          return newly_even_nodes
+
+     def alternating_path(self, node, ancestor, mate):
+          """returns the even alternating path [node, ..., ancestor] from an even node to an even ancestor
+             on its path to the root (Gabow's PATH, with an explicit stack instead of recursion)"""
+          path = []
+          #stack of (v, w, reverse): emit PATH(v, w), reversed if reverse; w == -1 emits just v
+          stack = [(node, ancestor, False)]
+          while stack:
+               v, w, reverse = stack.pop()
+               if w == -1 or v == w:
+                    path.append(v)
+               elif self.bridge_source[v] == -1:
+                    #v reached through its mate: PATH(v, w) = v, mate[v], PATH(parent[mate[v]], w)
+                    odd_node = mate[v]
+                    if reverse:
+                         stack.extend(((v, -1, False), (odd_node, -1, False), (self.parent[odd_node], w, True)))
+                    else:
+                         stack.extend(((self.parent[odd_node], w, False), (odd_node, -1, False), (v, -1, False)))
+               else:
+                    #v made even by the blossom closed by source - target:
+                    #PATH(v, w) = v, reversed PATH(source, mate[v]), PATH(target, w)
+                    source, target = self.bridge_source[v], self.bridge_target[v]
+                    if reverse:
+                         stack.extend(((v, -1, False), (source, mate[v], False), (target, w, True)))
+                    else:
+                         stack.extend(((target, w, False), (source, mate[v], True), (v, -1, False)))
+          return path
+
+     def path_to_root(self, node, mate):
+          #[node, ..., root], starting with the matched edge of node
+          return self.alternating_path(node, self.root[node], mate)
+
+
+def find_aug_path_indexed(graph, current_matching, roots = None, forest = None, stats = None, deadline = None):
+     """indexed counterpart of find_aug_path: returns an augmenting path [v_0, ..., v_n] (or []) given
+        an IndexedGraph and an IndexedMatching. Blossoms are contracted in place in the IndexedForest,
+        so one search costs O(E) up to the inverse Ackermann factor of the union-find.
+        Trees are grown one at a time from roots, a deque of unmatched vertices (default: all of them)
+        which is consumed. A tree that is exhausted without reaching another unmatched vertex is
+        Hungarian: none of its vertices can lie on an augmenting path of this or any later matching
+        obtained by augmentation, so they are left labelled HUNGARIAN in forest. Passing the same
+        roots and forest to successive searches therefore explores every Hungarian tree only once.
+        With deadline (a perf_counter() value), [] is also returned once the time is up, checked
+        for every vertex scanned."""
+     if stats is not None:
+          start_time, edges_scanned, blossoms = perf_counter(), 0, 0
+          contraction_seconds = expansion_seconds = 0.0
+     my_aug_path = []
+     mate = current_matching.mate
+     if roots is None:
+          roots = deque(u for u in range(len(mate)) if mate[u] == UNMATCHED)
+     elif not isinstance(roots, deque):
+          roots = deque(roots)
+     if forest is None:
+          forest = IndexedForest(len(mate))
+     label = forest.label
+
+     to_be_explored_nodes = deque()
+     try:
+          while True:
+               if deadline is not None and perf_counter() >= deadline:
+                    #out of time: the current tree is left unfinished, and reset
+                    return my_aug_path
+               if not to_be_explored_nodes:
+                    #the current tree (if any) is exhausted, start the next one
+                    forest.prune()
+                    while roots and (mate[roots[0]] != UNMATCHED or label[roots[0]] != UNLABELLED):
+                         roots.popleft()
+                    if not roots:
+                         return my_aug_path
+                    u = roots.popleft()
+                    forest.add_root(u)
+                    to_be_explored_nodes.append(u)
+
+               v = to_be_explored_nodes.popleft()
+               if stats is not None:
+                    edges_scanned += graph.degree(v)
+               for w in graph[v]:
+                    if label[w] == UNLABELLED:
+                         x = mate[w]
+                         if x == UNMATCHED:
+                              #w is the root of a tree that has not been started
+                              if stats is not None:
+                                   expansion_start_time = perf_counter()
+                              my_aug_path = forest.path_to_root(v, mate)
+                              my_aug_path.reverse()
+                              my_aug_path.append(w)
+                              if stats is not None:
+                                   expansion_seconds = perf_counter() - expansion_start_time
+                              return my_aug_path
+                         forest.add_edge(v, w)
+                         forest.add_edge(w, x)
+                         to_be_explored_nodes.append(x)
+                    elif label[w] == EVEN and forest.base_of(v) != forest.base_of(w):
+                         #every earlier tree is Hungarian, so w is in the tree of v
+                         #BLOSSOMS!!!!!!!
+                         if stats is not None:
+                              contraction_start_time = perf_counter()
+                         to_be_explored_nodes.extend(forest.bloom(v, w, mate))
+                         if stats is not None:
+                              blossoms += 1
+                              contraction_seconds += perf_counter() - contraction_start_time
+     finally:
+          forest.reset()
+          if stats is not None:
+               stats.search("indexed", edges_scanned, blossoms, int(bool(my_aug_path)), start_time,
+                            contraction_seconds, expansion_seconds)
+
+
+def find_max_matching_indexed(graph, current_matching, stats = None, deadline = None):
+     """augments current_matching (an IndexedMatching) to a maximum matching of graph (an IndexedGraph),
+        or until deadline (a perf_counter() value). Once it is maximum, its certificate is read off the
+        Hungarian trees"""
+     mate = current_matching.mate
+     if deadline is not None and perf_counter() >= deadline:
+          return current_matching
+     forest = IndexedForest(len(graph))
+     roots = deque(u for u in range(len(graph)) if mate[u] == UNMATCHED and graph.degree(u) > 0)
+     while True:
+          my_path = find_aug_path_indexed(graph, current_matching, roots, forest, stats, deadline)
+          if not my_path:
+               if deadline is None or perf_counter() < deadline:
+                    #every tree was grown to the end: they are all Hungarian
+                    current_matching.certificate = forest.gallai_edmonds_labels(mate)
+               return current_matching
+          current_matching.xor_aug_path(my_path)
+          if stats is not None:
+               stats.count("augmentations")
+
+
+def find_aug_paths_indexed(graph, current_matching, forest = None, stats = None, max_length = None, deadline = None):
+     """returns a maximal set of vertex-disjoint augmenting paths (a list of [v_0, ..., v_n]) given an
+        IndexedGraph and an IndexedMatching. All trees are grown together, level by level, from every
+        unmatched vertex; once two trees are joined by an augmenting path both are retired, and the
+        remaining trees keep growing. The paths found first are the short ones near the roots.
+        With max_length, as in find_aug_path, the even vertices deeper than max_length/2 are not scanned,
+        so that finding no path proves there is none of length <= max_length, unless a blossom was met:
+        contraction does not preserve path lengths, so after a blossom the search is complete.
+        With deadline (a perf_counter() value), the paths found so far are returned once the time is up.
+        If the search is complete and finds no path, the labels of its forest are the certificate of
+        current_matching, see IndexedMatching."""
+     if stats is not None:
+          start_time, edges_scanned, blossoms = perf_counter(), 0, 0
+          contraction_seconds = expansion_seconds = 0.0
+     mate = current_matching.mate
+     if forest is None:
+          forest = IndexedForest(len(mate))
+     label, root = forest.label, forest.root
+     is_used_tree = bytearray(len(mate))
+     #depth of the even vertices in their tree, while the search is bounded
+     depth = array('i', bytes(4*len(mate))) if max_length is not None else None
+
+     to_be_explored_nodes = deque()
+     for u in range(len(graph)):
+          if mate[u] == UNMATCHED and graph.degree(u) > 0:
+               forest.add_root(u)
+               to_be_explored_nodes.append(u)
+
+     my_aug_paths = []
+     try:
+          while to_be_explored_nodes:
+               if deadline is not None and perf_counter() >= deadline:
+                    break
+               v = to_be_explored_nodes.popleft()
+               if max_length is not None and 2*depth[v] > max_length:
+                    #the vertices are explored in order of depth
+                    break
+               if is_used_tree[root[v]]:
+                    continue
+               if stats is not None:
+                    edges_scanned += graph.degree(v)
+               for w in graph[v]:
+                    if label[w] == UNLABELLED:
+                         #w is matched, as every unmatched vertex is a root
+                         x = mate[w]
+                         forest.add_edge(v, w)
+                         forest.add_edge(w, x)
+                         to_be_explored_nodes.append(x)
+                         if max_length is not None:
+                              depth[x] = depth[v] + 2
+                    elif label[w] == EVEN and not is_used_tree[root[w]]:
+                         if root[w] != root[v]:
+                              if stats is not None:
+                                   expansion_start_time = perf_counter()
+                              my_aug_path = forest.path_to_root(v, mate)
+                              my_aug_path.reverse()
+                              my_aug_path.extend(forest.path_to_root(w, mate))
+                              my_aug_paths.append(my_aug_path)
+                              is_used_tree[root[v]] = is_used_tree[root[w]] = 1
+                              if stats is not None:
+                                   expansion_seconds += perf_counter() - expansion_start_time
+                              break
+                         if forest.base_of(v) != forest.base_of(w):
+                              #BLOSSOMS!!!!!!!
+                              if stats is not None:
+                                   contraction_start_time = perf_counter()
+                              to_be_explored_nodes.extend(forest.bloom(v, w, mate))
+                              max_length = None
+                              if stats is not None:
+                                   blossoms += 1
+                                   contraction_seconds += perf_counter() - contraction_start_time
+          else:
+               #every tree was grown to the end
+               if not my_aug_paths:
+                    current_matching.certificate = forest.gallai_edmonds_labels(mate)
+          return my_aug_paths
+     finally:
+          forest.reset()
+          if stats is not None:
+               stats.search("phases", edges_scanned, blossoms, len(my_aug_paths), start_time,
+                            contraction_seconds, expansion_seconds)
+
+
+def find_max_matching_phases(graph, current_matching, stats = None, max_length = None, deadline = None):
+     """augments current_matching (an IndexedMatching) to a maximum matching of graph (an IndexedGraph)
+        in phases, each applying a maximal set of vertex-disjoint augmenting paths found by one forest
+        build; the last phase finds none, which proves the matching maximum (with max_length, that there
+        is no augmenting path of length <= max_length, see find_aug_paths_indexed). With deadline (a
+        perf_counter() value), the phase running when the time is up applies the paths found so far"""
+     forest = IndexedForest(len(graph))
+     while deadline is None or perf_counter() < deadline:
+          my_paths = find_aug_paths_indexed(graph, current_matching, forest, stats, max_length, deadline)
+          if not my_paths:
+               break
+          for my_path in my_paths:
+               current_matching.xor_aug_path(my_path)
+          if stats is not None:
+               stats.count("augmentations", len(my_paths))
+     return current_matching
+
+
+def two_colouring(graph):
+     """returns colour[v] in {0, 1} with adjacent vertices coloured differently if graph (an IndexedGraph)
+        is bipartite, and None otherwise (one BFS over every component)"""
+     colour = array('b', [-1])*len(graph)
+     for source in range(len(graph)):
+          if colour[source] != -1:
+               continue
+          colour[source] = 0
+          to_be_explored_nodes = deque([source])
+          while to_be_explored_nodes:
+               v = to_be_explored_nodes.popleft()
+               for w in graph[v]:
+                    if colour[w] == -1:
+                         colour[w] = 1 - colour[v]
+                         to_be_explored_nodes.append(w)
+                    elif colour[w] == colour[v]:
+                         return None
+     return colour
+
+
+def find_max_matching_hopcroft_karp(graph, current_matching, colour, stats = None, max_length = None, deadline = None):
+     """augments current_matching (an IndexedMatching) to a maximum matching of a bipartite graph
+        (an IndexedGraph) with the Hopcroft-Karp algorithm; colour is a two_colouring of graph.
+        Each phase layers the graph by a BFS from the unmatched vertices of colour 0 and then
+        augments along a maximal set of vertex-disjoint augmenting paths that follow the layers;
+        there are no blossoms to handle. Unlike the textbook version, a phase does not stop at the
+        shortest augmenting paths, which needs several times fewer phases on sparse graphs.
+        With max_length, the layers stop at the augmenting paths of length <= max_length, and the last
+        phase proves there is none left. With deadline (a perf_counter() value), the phase running when
+        the time is up stops, keeping the augmentations it made"""
+     mate = current_matching.mate
+     indptr, indices = graph.indptr, graph.indices
+     infinity = len(graph) + 1
+     #an augmenting path ending after the left vertex u has 2*dist[u] + 1 edges
+     max_dist = infinity if max_length is None else (max_length - 1)//2
+     if deadline is not None and perf_counter() >= deadline:
+          return current_matching
+     dist = array('i', [infinity])*len(graph)
+     cursor = array('q', indptr)
+     free_left_vertices = [u for u in range(len(graph))
+                           if colour[u] == 0 and mate[u] == UNMATCHED and graph.degree(u) > 0]
+
+     while free_left_vertices:
+          if stats is not None:
+               start_time, cardinality = perf_counter(), current_matching.cardinality
+          #BFS: dist[u] = number of matched edges on the shortest alternating path to the left vertex u
+          layered_vertices = list(free_left_vertices)
+          for u in layered_vertices:
+               dist[u] = 0
+          to_be_explored_nodes = deque(layered_vertices)
+          has_aug_path = is_timed_out = False
+          while to_be_explored_nodes:
+               if deadline is not None and perf_counter() >= deadline:
+                    #out of time: the phase is dropped
+                    has_aug_path, is_timed_out = False, True
+                    break
+               u = to_be_explored_nodes.popleft()
+               for w in graph[u]:
+                    x = mate[w]
+                    if x == UNMATCHED:
+                         has_aug_path = True
+                    elif dist[x] == infinity and dist[u] < max_dist:
+                         dist[x] = dist[u] + 1
+                         to_be_explored_nodes.append(x)
+                         layered_vertices.append(x)
+
+          if stats is not None:
+               expansion_start_time = perf_counter()
+          if has_aug_path:
+               #DFS along the layers, with per-vertex cursors so that each edge is tried once per phase
+               for u in layered_vertices:
+                    cursor[u] = indptr[u]
+               for u in free_left_vertices:
+                    if is_timed_out:
+                         break
+                    left_stack, right_stack = [u], []
+                    while left_stack:
+                         if deadline is not None and perf_counter() >= deadline:
+                              is_timed_out = True
+                              break
+                         x = left_stack[-1]
+                         while cursor[x] < indptr[x+1]:
+                              w = indices[cursor[x]]
+                              cursor[x] += 1
+                              y = mate[w]
+                              if y == UNMATCHED:
+                                   right_stack.append(w)
+                                   for left_vertex, right_vertex in zip(left_stack, right_stack):
+                                        mate[left_vertex] = right_vertex
+                                        mate[right_vertex] = left_vertex
+                                   current_matching.cardinality += 1
+                                   left_stack = []
+                                   break
+                              elif dist[y] == dist[x] + 1:
+                                   right_stack.append(w)
+                                   left_stack.append(y)
+                                   break
+                         else:
+                              #dead end: no augmenting path through x in this phase
+                              dist[x] = infinity
+                              left_stack.pop()
+                              if right_stack:
+                                   right_stack.pop()
+
+          if stats is not None:
+               expansion_seconds = perf_counter() - expansion_start_time
+               #the BFS scans the edges of every layered vertex, the DFS those its cursors passed
+               edges_scanned = sum(graph.degree(u) for u in layered_vertices)
+               if has_aug_path:
+                    edges_scanned += sum(cursor[u] - indptr[u] for u in layered_vertices)
+               paths = current_matching.cardinality - cardinality
+               stats.search("hopcroft_karp", edges_scanned, 0, paths, start_time, 0.0, expansion_seconds)
+               stats.count("augmentations", paths)
+          for u in layered_vertices:
+               dist[u] = infinity
+          if not has_aug_path or is_timed_out:
+               break
+          free_left_vertices = [u for u in free_left_vertices if mate[u] == UNMATCHED]
+     return current_matching
+
+
+def matching_upper_bound_indexed(graph, deadline = None):
+     """returns an upper bound on the maximum matching cardinality of graph (an IndexedGraph) in O(V+E). As in
+        Karp-Sipser, a vertex of degree 1 is matched to its neighbour (some maximum matching does) and both are
+        removed, until there is none left, which is exact. Each connected component C of what remains, the core,
+        then adds the smaller of |C|//2 and the size of a greedy vertex cover of C (every matched edge has an
+        endpoint in the cover): a vertex of largest degree, or the neighbour of a vertex of degree 1.
+        The bound is exact on forests and whenever the core components have near-perfect matchings, as on
+        sparse random graphs, but not in general. If the time is up at deadline (a perf_counter() value), the
+        vertices not removed yet count half their number, or the core components |C|//2 each"""
+     indptr, indices = graph.indptr, graph.indices
+     no_of_vertices = len(graph)
+     no_of_matched_edges = 0
+     no_of_live_vertices = sum(1 for v in range(no_of_vertices) if indptr[v+1] > indptr[v])
+     if deadline is not None and perf_counter() >= deadline:
+          return no_of_live_vertices//2
+     #live degrees: the number of edges to vertices not removed yet (removed vertices have degree 0)
+     degree = array('i', (indptr[v+1] - indptr[v] for v in range(no_of_vertices)))
+     leaves = array('i', (v for v in range(no_of_vertices) if degree[v] == 1))
+     while leaves:
+          if deadline is not None and perf_counter() >= deadline:
+               return no_of_matched_edges + no_of_live_vertices//2
+          v = leaves.pop()
+          if degree[v] != 1:
+               continue
+          u = next(indices[k] for k in range(indptr[v], indptr[v+1]) if degree[indices[k]] > 0)
+          #removing u leaves v (and u's other leaves) with degree 0
+          no_of_matched_edges += 1
+          no_of_live_vertices -= 1
+          for k in range(indptr[u], indptr[u+1]):
+               w = indices[k]
+               if degree[w] > 0:
+                    degree[w] -= 1
+                    if degree[w] == 1:
+                         leaves.append(w)
+                    elif degree[w] == 0:
+                         no_of_live_vertices -= 1
+          degree[u] = 0
+
+     #the connected components of the core
+     component = array('i', [-1])*no_of_vertices
+     sizes = []
+     for source in range(no_of_vertices):
+          if degree[source] == 0 or component[source] != -1:
+               continue
+          component[source] = len(sizes)
+          size, stack = 0, [source]
+          while stack:
+               if deadline is not None and perf_counter() >= deadline:
+                    return no_of_matched_edges + sum(size//2 for size in sizes) + (no_of_live_vertices - sum(sizes))//2
+               v = stack.pop()
+               size += 1
+               for k in range(indptr[v], indptr[v+1]):
+                    w = indices[k]
+                    if degree[w] > 0 and component[w] == -1:
+                         component[w] = len(sizes)
+                         stack.append(w)
+          sizes.append(size)
+
+     #greedy cover of the core, with a bucket queue over live degrees (2 or more); a vertex is queued again
+     #whenever its degree drops, and stale entries are skipped
+     cover_sizes = [0]*len(sizes)
+     buckets = [array('i') for _ in range(max(degree, default = 0) + 1)]
+     for v in range(no_of_vertices):
+          if degree[v] > 1:
+               buckets[degree[v]].append(v)
+     max_degree = len(buckets) - 1
+     while True:
+          if deadline is not None and perf_counter() >= deadline:
+               return no_of_matched_edges + sum(size//2 for size in sizes)
+          if leaves:
+               v = leaves.pop()
+               if degree[v] != 1:
+                    continue
+               u = next(indices[k] for k in range(indptr[v], indptr[v+1]) if degree[indices[k]] > 0)
+          else:
+               while max_degree > 1 and not buckets[max_degree]:
+                    max_degree -= 1
+               if max_degree <= 1:
+                    break
+               u = buckets[max_degree].pop()
+               if degree[u] != max_degree:
+                    continue
+          cover_sizes[component[u]] += 1
+          for k in range(indptr[u], indptr[u+1]):
+               w = indices[k]
+               if degree[w] > 0:
+                    degree[w] -= 1
+                    if degree[w] == 1:
+                         leaves.append(w)
+                    elif degree[w] > 1:
+                         buckets[degree[w]].append(w)
+          degree[u] = 0
+     return no_of_matched_edges + sum(min(size//2, cover_size) for size, cover_size in zip(sizes, cover_sizes))
+
+
+def find_a_maximal_matching_indexed(graph):
+     """returns a maximal IndexedMatching of graph (an IndexedGraph), matching low degree vertices first"""
+     matching = IndexedMatching(len(graph))
+     mate = matching.mate
+     degree = [graph.degree(v) for v in range(len(graph))]
+     for v in sorted(range(len(graph)), key = degree.__getitem__):
+          if mate[v] == UNMATCHED:
+               candidates = [w for w in graph[v] if mate[w] == UNMATCHED]
+               if candidates:
+                    w = min(candidates, key = degree.__getitem__)
+                    mate[v] = w
+                    mate[w] = v
+                    matching.cardinality += 1
+     return matching
+
+
+def find_a_maximal_matching_karp_sipser(graph, deadline = None):
+     """returns a maximal IndexedMatching of graph (an IndexedGraph) with the Karp-Sipser rule on live degrees
+        (the number of unmatched neighbours): a vertex of degree 1 is matched to its neighbour, which keeps the
+        matching extendable to a maximum one, and otherwise a vertex of minimum degree is matched to its
+        neighbour of minimum degree. Matched vertices are deleted lazily, so apart from the CSR arrays of graph
+        only the mate and degree arrays and a bucket queue of vertex indices are kept. With deadline (a
+        perf_counter() value), the matching so far, which may not be maximal, is returned once the time is up.
+        There is deliberately no degree-2 fold (merging the two neighbours of a vertex of degree 2): merged
+        neighbourhoods cannot be kept in the CSR arrays, and the minimum degree rule gave initial matchings at
+        least as large on G(n,3/n), G(n,10/n), random 3-regular, grid and nested-blossom graphs, e.g. 92744
+        against 92729 with folds, of a maximum of 92749, on G(n,3/n) with n=200k"""
+     indptr, indices = graph.indptr, graph.indices
+     matching = IndexedMatching(len(graph))
+     mate = matching.mate
+     if deadline is not None and perf_counter() >= deadline:
+          return matching
+     degree = array('i', (indptr[v+1] - indptr[v] for v in range(len(graph))))
+
+     #bucket queue over live degrees; a vertex is queued again only when its degree drops to 2 or less
+     #(so that degree 1 vertices are found), otherwise a stale entry is moved to the right bucket when popped
+     buckets = [array('i') for _ in range(max(degree, default = 0) + 1)]
+     for v in range(len(graph)):
+          if degree[v] > 0:
+               buckets[degree[v]].append(v)
+     min_degree = 1
+     while min_degree < len(buckets):
+          if deadline is not None and perf_counter() >= deadline:
+               break
+          if not buckets[min_degree]:
+               min_degree += 1
+               continue
+          v = buckets[min_degree].pop()
+          if mate[v] != UNMATCHED or degree[v] == 0 or degree[v] > min_degree:
+               continue
+          if degree[v] < min_degree:
+               buckets[degree[v]].append(v)
+               min_degree = degree[v]
+               continue
+          w, w_degree = UNMATCHED, 0
+          for k in range(indptr[v], indptr[v+1]):
+               y = indices[k]
+               if mate[y] == UNMATCHED and (w == UNMATCHED or degree[y] < w_degree):
+                    w, w_degree = y, degree[y]
+          mate[v] = w
+          mate[w] = v
+          matching.cardinality += 1
+          for u in (v, w):
+               for k in range(indptr[u], indptr[u+1]):
+                    y = indices[k]
+                    if mate[y] == UNMATCHED:
+                         degree[y] -= 1
+                         if 0 < degree[y] <= 2:
+                              buckets[degree[y]].append(y)
+                              if degree[y] < min_degree:
+                                   min_degree = degree[y]
+     return matching
+
+
+ENGINES = ("auto", "hopcroft_karp", "indexed", "phases", "reference")
+
+
+def solve_indexed_matching(graph, engine = "auto", initial_matching = None, stats = None, approximate = None,
+                           deadline = None):
+     """returns a maximum IndexedMatching of graph (an IndexedGraph); engine is "indexed" (array-backed
+        core, one augmenting path per search), "phases" (array-backed core, a maximal set of disjoint
+        augmenting paths per search), "hopcroft_karp" (bipartite graphs only), "reference" (Forest/Matching
+        on the labels) or "auto" (hopcroft_karp if the graph is bipartite, else phases).
+        The search starts from initial_matching if given (see IndexedMatching.from_warm_start), so that
+        re-solving a slightly changed graph only needs a few augmentations. stats is an optional SolverStats.
+        approximate = k (not with the indexed engine) stops once there is no augmenting path of length
+        <= 2k+1, see find_max_matching: upper_bound of the matching returned is then at most
+        cardinality*(k+2)//(k+1). deadline (a perf_counter() value) stops the search once the time is up,
+        and upper_bound is then matching_upper_bound_indexed, computed first within the time budget.
+        A maximum matching comes with its certificate (see IndexedMatching): the phases and indexed engines
+        read it off their last search, the others run one more find_aug_paths_indexed"""
+     assert(engine in ENGINES), f"unknown engine {engine!r}, expected one of {ENGINES}"
+     assert(approximate is None or engine != "indexed"), "approximate needs the phases, hopcroft_karp or reference engine"
+     if initial_matching is not None:
+          initial_matching = IndexedMatching.from_warm_start(initial_matching, graph)
+     if engine == "reference":
+          graph_adjacency_dict, vertices = graph.to_adjacency_dict(), set(graph.labels)
+          with _phase(stats, "initial_matching"):
+               if initial_matching is not None:
+                    current_matching = Matching(initial_matching.to_match_dict(graph.labels))
+               else:
+                    current_matching = find_a_maximal_matching(graph_adjacency_dict, vertices)
+          with _phase(stats, "augment"):
+               find_max_matching(graph_adjacency_dict, current_matching, vertices, stats, approximate = approximate,
+                                 deadline = deadline)
+          matching = IndexedMatching.from_match_dict(current_matching.matchdict, graph.labels)
+          matching.upper_bound = current_matching.upper_bound
+          if matching.upper_bound == matching.cardinality:
+               with _phase(stats, "certificate"):
+                    find_aug_paths_indexed(graph, matching, stats = stats, deadline = deadline)
+          return matching
+     if deadline is not None or approximate is not None:
+          with _phase(stats, "upper_bound"):
+               upper_bound = matching_upper_bound_indexed(graph, deadline)
+     if engine in ("auto", "hopcroft_karp"):
+          with _phase(stats, "two_colouring"):
+               colour = two_colouring(graph)
+          if colour is not None:
+               engine = "hopcroft_karp"
+          else:
+               assert(engine == "auto"), "hopcroft_karp engine needs a bipartite graph"
+               engine = "phases"
 
      #Find a maximal matching
-     current_matching = find_a_maximal_matching(graph_adjacency_dict,vertices)
+     with _phase(stats, "initial_matching"):
+          if initial_matching is not None:
+               current_matching = initial_matching
+          else:
+               current_matching = find_a_maximal_matching_karp_sipser(graph, deadline)
 
      #Find maximum matching
-     final_match_dict, no_of_matched_edges = find_max_matching(graph_adjacency_dict, current_matching, vertices)
+     max_length = None if approximate is None else 2*approximate + 1
+     with _phase(stats, "augment"):
+          if engine == "hopcroft_karp":
+               find_max_matching_hopcroft_karp(graph, current_matching, colour, stats, max_length, deadline)
+          elif engine == "phases":
+               find_max_matching_phases(graph, current_matching, stats, max_length, deadline)
+          else:
+               find_max_matching_indexed(graph, current_matching, stats, deadline)
+     if engine == "hopcroft_karp" and approximate is None and (deadline is None or perf_counter() < deadline):
+          with _phase(stats, "certificate"):
+               find_aug_paths_indexed(graph, current_matching, stats = stats, deadline = deadline)
+     cardinality = current_matching.cardinality
+     if current_matching.certificate is not None:
+          current_matching.upper_bound = cardinality
+     elif deadline is not None and perf_counter() >= deadline:
+          #the last search may have been cut short
+          current_matching.upper_bound = upper_bound
+     elif approximate is not None:
+          current_matching.upper_bound = min(cardinality*(approximate + 2)//(approximate + 1), upper_bound)
+     else:
+          current_matching.upper_bound = cardinality
+     return current_matching
+
+
+def connected_components(graph):
+     """returns the connected components of graph (an IndexedGraph) with at least one edge, each as the
+        list of its vertex indices in BFS order; isolated vertices are left out since they are never matched"""
+     seen = array('b', bytes(len(graph)))
+     components = []
+     for source in range(len(graph)):
+          if seen[source] or graph.degree(source) == 0:
+               continue
+          seen[source] = 1
+          component = [source]
+          for v in component:
+               for w in graph[v]:
+                    if not seen[w]:
+                         seen[w] = 1
+                         component.append(w)
+          components.append(component)
+     return components
+
+
+def _solve_csr_payload(indptr, indices, engine, initial_mate = None, stats = None, approximate = None, deadline = None):
+     #worker side of solve_indexed_graph_by_components: the payload is a bare CSR graph (and the
+     #mate array to start from), the result is its mate array, upper bound and certificate, pickled as flat arrays
+     #deadline is a time() value, which unlike perf_counter() can be compared across processes
+     initial_matching = None
+     if initial_mate is not None:
+          initial_matching = IndexedMatching(0)
+          initial_matching.mate = initial_mate
+     if deadline is not None:
+          deadline = perf_counter() + deadline - time()
+     matching = solve_indexed_matching(IndexedGraph(indptr, indices), engine, initial_matching, stats, approximate,
+                                       deadline)
+     return matching.mate, matching.upper_bound, matching.certificate
+
+
+def solve_indexed_matching_by_components(graph, engine = "auto", max_workers = None, min_parallel_size = 20000,
+                                         initial_matching = None, stats = None, approximate = None, deadline = None):
+     """returns a maximum IndexedMatching of graph (an IndexedGraph), solving each connected component separately (a maximum matching is the union of maximum matchings
+        of the components). Components are packed into chunks of at least min_parallel_size (vertices + edges);
+        chunks of large components are solved by a ProcessPoolExecutor with max_workers processes (None: one
+        per CPU), and the small components are solved in this process meanwhile. max_workers = 1 solves
+        everything here, one component at a time. Workers are sent the CSR arrays of their chunk only,
+        stats (a SolverStats) records the components solved in this process. With approximate or deadline
+        (see solve_indexed_matching), upper_bound is the sum of the upper bounds of the chunks, and the
+        certificate is the union of those of the chunks if they all have one"""
+     matching = IndexedMatching(len(graph))
+     mate = matching.mate
+     upper_bounds = []
+     #the isolated vertices are in no chunk, and EVEN
+     certificate, is_certified = array('b', [EVEN])*len(graph), []
+     #the arguments of every solve of a chunk, here or in a worker
+     options = {"approximate": approximate, "deadline": None if deadline is None else time() + deadline - perf_counter()}
+     initial_mate = None
+     if initial_matching is not None:
+          initial_mate = IndexedMatching.from_warm_start(initial_matching, graph).mate
+     local_index = array('i', bytes(4*len(graph)))
+
+     def payload(chunk_vertices):
+          #arguments of _solve_csr_payload for the subgraph induced by chunk_vertices
+          subgraph = graph.induced_subgraph(chunk_vertices)
+          if initial_mate is None:
+               return subgraph.indptr, subgraph.indices, engine, None
+          for i, v in enumerate(chunk_vertices):
+               local_index[v] = i
+          chunk_mate = array('i', (local_index[initial_mate[v]] if initial_mate[v] != UNMATCHED else UNMATCHED
+                                   for v in chunk_vertices))
+          return subgraph.indptr, subgraph.indices, engine, chunk_mate
+
+     def merge(chunk_vertices, result):
+          #translate the chunk indices back to indices of graph
+          chunk_mate, chunk_upper_bound, chunk_certificate = result
+          for v, w in zip(chunk_vertices, chunk_mate):
+               if w != UNMATCHED:
+                    mate[v] = chunk_vertices[w]
+          upper_bounds.append(chunk_upper_bound)
+          is_certified.append(chunk_certificate is not None)
+          if chunk_certificate is not None:
+               for v, label in zip(chunk_vertices, chunk_certificate):
+                    certificate[v] = label
+
+     with _phase(stats, "components"):
+          components = connected_components(graph)
+     if max_workers == 1:
+          for component in components:
+               merge(component, _solve_csr_payload(*payload(component), stats = stats, **options))
+     else:
+          #pack large components into chunks, keep the small ones for this process
+          chunks, inline_vertices, chunk_vertices, chunk_size = [], [], [], 0
+          for component in sorted(components, key = len, reverse = True):
+               size = len(component) + sum(graph.degree(v) for v in component)//2
+               if size < min_parallel_size and not chunk_vertices:
+                    inline_vertices.extend(component)
+                    continue
+               chunk_vertices.extend(component)
+               chunk_size += size
+               if chunk_size >= min_parallel_size:
+                    chunks.append(chunk_vertices)
+                    chunk_vertices, chunk_size = [], 0
+          inline_vertices.extend(chunk_vertices)
+
+          if len(chunks) > 0:
+               with ProcessPoolExecutor(max_workers = max_workers) as executor:
+                    futures = [executor.submit(_solve_csr_payload, *payload(chunk), **options) for chunk in chunks]
+                    if inline_vertices:
+                         merge(inline_vertices, _solve_csr_payload(*payload(inline_vertices), stats = stats, **options))
+                    for chunk, future in zip(chunks, futures):
+                         merge(chunk, future.result())
+          elif inline_vertices:
+               merge(inline_vertices, _solve_csr_payload(*payload(inline_vertices), stats = stats, **options))
+
+     matching.cardinality = sum(1 for w in mate if w != UNMATCHED)//2
+     matching.upper_bound = sum(upper_bounds)
+     if all(is_certified):
+          matching.certificate = certificate
+     return matching
+
+
+def solve_indexed_graph_by_components(graph, engine = "auto", max_workers = None, min_parallel_size = 20000,
+                                      initial_matching = None, stats = None, approximate = None, deadline = None):
+     """returns (final_match_dict, no_of_matched_edges) of a maximum matching of graph (an IndexedGraph),
+        see solve_indexed_matching_by_components"""
+     current_matching = solve_indexed_matching_by_components(graph, engine, max_workers, min_parallel_size,
+                                                             initial_matching, stats, approximate, deadline)
+     with _phase(stats, "output"):
+          return current_matching.to_match_dict(graph.labels), current_matching.cardinality
+
+
+def _solve(graph, engine, max_workers, initial_matching, stats, approximate = None, deadline = None):
+     #maximum IndexedMatching of graph, by components if max_workers is given
+     if max_workers is not None:
+          return solve_indexed_matching_by_components(graph, engine, max_workers, initial_matching = initial_matching,
+                                                      stats = stats, approximate = approximate, deadline = deadline)
+     return solve_indexed_matching(graph, engine, initial_matching, stats, approximate, deadline)
+
 
+def solve_indexed_graph(graph, engine = "auto", max_workers = None, initial_matching = None, stats = None,
+                        approximate = None, deadline = None):
+     """returns (final_match_dict, no_of_matched_edges) of a maximum matching of graph (an IndexedGraph),
+        see solve_indexed_matching for the engines, initial_matching, stats, approximate and deadline; with
+        max_workers given, the connected components are solved separately, see solve_indexed_matching_by_components"""
+     current_matching = _solve(graph, engine, max_workers, initial_matching, stats, approximate, deadline)
+     with _phase(stats, "output"):
+          return current_matching.to_match_dict(graph.labels), current_matching.cardinality
+
+
+class _TransientForest(IndexedForest):
+     #IndexedForest for a graph that changes between searches: the Hungarian trees of a search are skipped
+     #until its end only, as reset() clears them too
+     __slots__ = ("pruned",)
+
+     def __init__(self, no_of_vertices):
+          IndexedForest.__init__(self, no_of_vertices)
+          self.pruned = []
+
+     def prune(self):
+          for v in self.touched:
+               self.label[v] = HUNGARIAN
+          self.pruned.extend(self.touched)
+          self.touched = []
+
+     def reset(self):
+          self.touched.extend(self.pruned)
+          self.pruned = []
+          IndexedForest.reset(self)
+
+
+class DynamicMatching:
+     """maximum matching of a graph which changes one edge or vertex at a time. The vertices are interned to
+        indices as in the integer-indexed core: the graph is a list of neighbour lists and the matching an
+        IndexedMatching. An update changes the maximum cardinality by at most one, and it is restored by
+        find_aug_path_indexed searches rooted at the vertices the update exposed, whose cost is that of the
+        trees grown from those roots rather than of the graph. Indices of removed vertices are reused"""
+
+     def __init__(self, edge_list = (), list_of_vertices = ()):
+          self.index = {}
+          self.labels = []
+          self.free_indices = []
+          for v in list_of_vertices:
+               if v not in self.index:
+                    self._new_index(v)
+          sources = array('i')
+          targets = array('i')
+          for v, w in edge_list:
+               i, j = (self.index[u] if u in self.index else self._new_index(u) for u in (v, w))
+               sources.extend((i, j))
+               targets.extend((j, i))
+          graph = IndexedGraph.from_directed_pairs(len(self.labels), sources, targets)
+          self.neighbours = [list(graph[v]) for v in range(len(graph))]
+          self.matching = solve_indexed_matching(graph)
+          self.forest = None
+
+     def _new_index(self, v):
+          self.index[v] = len(self.labels)
+          self.labels.append(v)
+          return self.index[v]
+
+     @property
+     def vertices(self):
+          return self.index.keys()
+
+     @property
+     def cardinality(self):
+          return self.matching.cardinality
+
+     @property
+     def matchdict(self):
+          """{label: matched label or None}, built on each call"""
+          labels, mate = self.labels, self.matching.mate
+          return {v: (labels[mate[i]] if mate[i] != UNMATCHED else None) for v, i in self.index.items()}
+
+     @property
+     def graph_adjacency_dict(self):
+          """{label: set of neighbour labels}, built on each call"""
+          labels = self.labels
+          return {v: {labels[j] for j in self.neighbours[i]} for v, i in self.index.items()}
+
+     def _match(self, i, j):
+          self.matching.mate[i] = j
+          self.matching.mate[j] = i
+          self.matching.cardinality += 1
+
+     def _unmatch(self, i, j):
+          self.matching.mate[i] = UNMATCHED
+          self.matching.mate[j] = UNMATCHED
+          self.matching.cardinality -= 1
+
+     def _augment(self, roots, hidden = ()):
+          #one search from roots (unmatched vertex indices), augmenting along the path it finds;
+          #the hidden vertices are left out of the search
+          mate = self.matching.mate
+          if self.forest is None or len(self.forest.label) < len(mate):
+               self.forest = _TransientForest(2*len(mate))
+          for v in hidden:
+               self.forest.label[v] = HUNGARIAN
+          self.forest.pruned.extend(hidden)
+          my_path = find_aug_path_indexed(self.neighbours, self.matching, deque(roots), self.forest)
+          if my_path:
+               self.matching.xor_aug_path(my_path)
+          return my_path
+
+     def add_vertex(self, v):
+          assert(v not in self.index), f"vertex {v!r} already in the graph"
+          if self.free_indices:
+               i = self.free_indices.pop()
+               self.index[v] = i
+               self.labels[i] = v
+          else:
+               self._new_index(v)
+               self.neighbours.append([])
+               self.matching.mate.append(UNMATCHED)
+
+     def remove_vertex(self, v):
+          assert(v in self.index), f"vertex {v!r} not in the graph"
+          i = self.index.pop(v)
+          j = self.matching.mate[i]
+          if j != UNMATCHED:
+               self._unmatch(i, j)
+          for k in self.neighbours[i]:
+               self.neighbours[k].remove(i)
+          self.neighbours[i] = []
+          self.labels[i] = None
+          self.free_indices.append(i)
+          if j != UNMATCHED:
+               #an augmenting path has to end at j
+               self._augment([j])
+
+     def add_edge(self, v, w):
+          """adds the edge (v, w), and its endpoints if they are not in the graph yet"""
+          assert(v != w), "no self loops allowed"
+          for u in (v, w):
+               if u not in self.index:
+                    self.add_vertex(u)
+          i, j = self.index[v], self.index[w]
+          if j in self.neighbours[i]:
+               return
+          self.neighbours[i].append(j)
+          self.neighbours[j].append(i)
+          mate = self.matching.mate
+          exposed = [k for k in (i, j) if mate[k] == UNMATCHED]
+          if len(exposed) == 2:
+               self._match(i, j)
+          elif len(exposed) == 1:
+               #an augmenting path has to use (i, j), so it ends at the unmatched endpoint
+               self._augment(exposed)
+          else:
+               #the new edge adds to the cardinality if and only if some maximum matching misses both i and j.
+               #A search from the mate of i without i frees i (along an even alternating path) if it can be,
+               #then one from the mate of j without i and j frees j if it can be missed as well
+               for u, hidden in ((i, [i]), (j, [i, j])):
+                    k = mate[u]
+                    self._unmatch(u, k)
+                    if not self._augment([k], hidden):
+                         self._match(u, k)
+                         return
+               self._match(i, j)
+
+     def remove_edge(self, v, w):
+          assert(v in self.index and w in self.index and self.index[w] in self.neighbours[self.index[v]]), \
+               f"edge {(v, w)!r} not in the graph"
+          i, j = self.index[v], self.index[w]
+          self.neighbours[i].remove(j)
+          self.neighbours[j].remove(i)
+          if self.matching.mate[i] == j:
+               self._unmatch(i, j)
+               #an augmenting path has to end at i or j
+               self._augment([i, j])
+
+
+class MatchingResult:
+     """maximum matching returned by the run_blossoms_algorithm* functions: mate[v] is the index of the
+        vertex matched to the vertex with index v (or UNMATCHED), labels[v] its label; timings holds the
+        seconds spent building the graph, solving, and in total, and stats the SolverStats if one was
+        passed. upper_bound bounds the maximum cardinality: it is the cardinality itself unless the
+        matching is approximate or the time budget ran out, and ratio = cardinality/upper_bound is its
+        guaranteed ratio. certificate[v] is the label of the vertex with index v in the Gallai-Edmonds
+        decomposition that proves the matching maximum (see IndexedMatching), or certificate is None.
+        The match_dict, the certificate_dict and the edge list are only built when asked for."""
+     __slots__ = ("mate", "labels", "cardinality", "timings", "stats", "upper_bound", "certificate", "_match_dict",
+                  "_certificate_dict")
+
+     def __init__(self, mate, labels, cardinality, timings = None, stats = None, upper_bound = None,
+                  certificate = None):
+          self.mate = mate
+          self.labels = labels
+          self.cardinality = cardinality
+          self.timings = timings if timings is not None else {}
+          self.stats = stats
+          self.upper_bound = upper_bound if upper_bound is not None else cardinality
+          self.certificate = certificate
+          self._match_dict = None
+          self._certificate_dict = None
+
+     @property
+     def ratio(self):
+          """guaranteed ratio of the cardinality to the maximum cardinality"""
+          return self.cardinality/self.upper_bound if self.upper_bound else 1.0
+
+     @property
+     def match_dict(self):
+          """{label: matched label or None}, as printed by run_blossoms_algorithm"""
+          if self._match_dict is None:
+               labels = self.labels
+               self._match_dict = {labels[v]: (labels[w] if w != UNMATCHED else None) for v, w in enumerate(self.mate)}
+          return self._match_dict
+
+     @property
+     def certificate_dict(self):
+          """{label: EVEN, ODD or UNLABELLED}, the certificate as verify_max_matching takes it, or None"""
+          if self._certificate_dict is None and self.certificate is not None:
+               self._certificate_dict = dict(zip(self.labels, self.certificate))
+          return self._certificate_dict
+
+     def edges(self):
+          """returns the list of matched edges (v, w) as label pairs, each edge once"""
+          labels = self.labels
+          return [(labels[v], labels[w]) for v, w in enumerate(self.mate) if v < w]
+
+     def __repr__(self):
+          return (f"MatchingResult(cardinality={self.cardinality}, no_of_vertices={len(self.mate)}, "
+                  f"seconds={self.timings.get('total', 0):.6f})")
+
+
+def print_results(final_match_dict, no_of_matched_edges, start_time):
      #Print results and statistics
      print("Maximum Matching : ", end ='')
      pprint.pprint(final_match_dict)
@@ -339,39 +2081,77 @@ def run_blossoms_algorithm(adjacency_matrix, list_of_vertices = None):
      print(f"Number of matched edges : {no_of_matched_edges}")
 
      print(f"Time taken : {time()-start_time}")
-             
-            
-
-        
+     
+     
+def _solve_and_report(graph, engine, max_workers, initial_matching, stats, verbose, start_time, approximate = None,
+                      deadline = None):
+     #solves graph for the run_blossoms_algorithm* functions
+     build_time = time()
+     current_matching = _solve(graph, engine, max_workers, initial_matching, stats, approximate, deadline)
+     end_time = time()
+     result = MatchingResult(current_matching.mate, graph.labels, current_matching.cardinality,
+                             {"build_graph": build_time - start_time, "solve": end_time - build_time,
+                              "total": end_time - start_time}, stats, current_matching.upper_bound,
+                             current_matching.certificate)
+     if verbose:
+          print_results(result.match_dict, result.cardinality, start_time)
+     return result
 
-                    
-        
-        
-        
-        
-        
 
+def run_blossoms_algorithm(adjacency_matrix, list_of_vertices = None, engine = "auto", max_workers = None,
+                           initial_matching = None, stats = None, verbose = True, approximate = None,
+                           time_budget = None):
+     """returns a MatchingResult with a maximum matching of the graph given its adjacency matrix and
+        list_of_vertices, and prints it unless verbose is False; approximate = k stops at a matching within
+        (k+1)/(k+2) of the maximum, and time_budget (seconds, including building the graph) stops it when the
+        time is up, see solve_indexed_matching"""
+     start_time = time()
+     deadline = None if time_budget is None else perf_counter() + time_budget
+     
+     no_of_vertices = len(adjacency_matrix)
+     if list_of_vertices is None:
+          list_of_vertices = list(range(no_of_vertices))
 
+          
+     #ensuring matrix dimensions are compatible with list of_vertices
+     assert(no_of_vertices == len(list_of_vertices)), "no_of_vertices not compatible with adjacency matrix row dimension"
+     assert(all([no_of_vertices == len(row) for row in adjacency_matrix])), "no_of_vertices not compatible with adjacency matrix col dimension"
+     
+          
+     #Create the graph, interning the vertex labels to 0,1,...,n-1
+     with _phase(stats, "build_graph"):
+          graph = IndexedGraph.from_adjacency_matrix(adjacency_matrix, list_of_vertices)
 
-        
-    
-    
-            
-            
-            
-        
-        
-  
-        
-        
-        
+     return _solve_and_report(graph, engine, max_workers, initial_matching, stats, verbose, start_time, approximate,
+                              deadline)
 
 
-                        
+def run_blossoms_algorithm_on_edges(edge_list, list_of_vertices = None, engine = "auto", max_workers = None,
+                                    initial_matching = None, stats = None, verbose = True, approximate = None,
+                                    time_budget = None):
+     """sparse counterpart of run_blossoms_algorithm: takes an iterable of (v, w) edges,
+        so memory and build time grow with the number of edges rather than no_of_vertices**2"""
+     start_time = time()
+     deadline = None if time_budget is None else perf_counter() + time_budget
 
+     #Create the graph, interning the vertex labels to 0,1,...,n-1
+     with _phase(stats, "build_graph"):
+          graph = IndexedGraph.from_edges(edge_list, list_of_vertices)
 
+     return _solve_and_report(graph, engine, max_workers, initial_matching, stats, verbose, start_time, approximate,
+                              deadline)
 
 
-     
+def run_blossoms_algorithm_on_csr(indptr, indices, list_of_vertices = None, engine = "auto", max_workers = None,
+                                  initial_matching = None, stats = None, verbose = True, approximate = None,
+                                  time_budget = None):
+     """sparse counterpart of run_blossoms_algorithm: takes the adjacency matrix in CSR form (indptr, indices)"""
+     start_time = time()
+     deadline = None if time_budget is None else perf_counter() + time_budget
 
+     #Create the graph, interning the vertex labels to 0,1,...,n-1
+     with _phase(stats, "build_graph"):
+          graph = IndexedGraph.from_csr(indptr, indices, list_of_vertices)
 
+     return _solve_and_report(graph, engine, max_workers, initial_matching, stats, verbose, start_time, approximate,
+                              deadline)
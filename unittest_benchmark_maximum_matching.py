@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+
+import unittest
+from maximum_matching import IndexedGraph, solve_indexed_graph
+from benchmark_maximum_matching import *
+
+
+class TestGenerators(unittest.TestCase):
+     def test_gnp_graph(self):
+          """checks G(n,p) extremes, determinism and the expected number of edges"""
+          self.assertEqual(gnp_graph(10, 0), [])
+          self.assertEqual(len(gnp_graph(10, 1)), 45)
+          self.assertEqual(gnp_graph(1000, 0.01, seed = 3), gnp_graph(1000, 0.01, seed = 3))
+          edge_list = gnp_graph(1000, 0.01, seed = 3)
+          self.assertTrue(4000 < len(edge_list) < 6000)
+          self.assertTrue(all(0 <= v < w < 1000 for v, w in edge_list))
+          self.assertEqual(len(set(edge_list)), len(edge_list))
+
+
+     def test_random_regular_graph(self):
+          """checks the degrees of a random regular graph"""
+          graph = IndexedGraph.from_edges(random_regular_graph(1000, 3, seed = 1), list(range(1000)))
+          degrees = [graph.degree(v) for v in range(len(graph))]
+          self.assertTrue(max(degrees) == 3 and sum(degrees) >= 3*1000 - 20)
+
+
+     def test_grid_graph(self):
+          """checks the grid size and its perfect matching"""
+          edge_list = grid_graph(4, 5)
+          self.assertEqual(len(edge_list), 4*4 + 3*5)
+          self.assertEqual(solve_indexed_graph(IndexedGraph.from_edges(edge_list))[1], 10)
+
+
+     def test_nested_blossoms_graph(self):
+          """checks the nested odd cycles (and their stem) have a perfect matching"""
+          edge_list = nested_blossoms_graph(3)
+          graph = IndexedGraph.from_edges(edge_list)
+          self.assertEqual(len(graph), 27 + 3)
+          self.assertEqual(len(edge_list), 9*3 + 3*3 + 3 + 3)
+          for engine in ("indexed", "phases", "reference"):
+               self.assertEqual(solve_indexed_graph(graph, engine, initial_matching = {})[1], 15)
+
+
+class TestHarness(unittest.TestCase):
+     def test_run_benchmarks(self):
+          """checks the keys and fields of a small sweep"""
+          results = run_benchmarks(["grid", "nested_blossoms"], [30], ["auto", "reference"], memory = True)
+          self.assertEqual(set(results), {"grid/30/auto", "grid/30/reference",
+                                          "nested_blossoms/30/auto", "nested_blossoms/30/reference"})
+          for result in results.values():
+               self.assertEqual(set(result), {"time", "peak_memory", "cardinality"})
+          self.assertEqual(results["grid/30/auto"]["cardinality"], 12)
+
+
+     def test_find_regressions(self):
+          """checks that slowdowns, memory growth and changed cardinalities beyond the tolerance are flagged"""
+          baseline = {"a": {"time": 1.0, "peak_memory": 100, "cardinality": 5},
+                      "b": {"time": 0.001, "peak_memory": 100, "cardinality": 5},
+                      "c": {"time": 1.0, "cardinality": 5}}
+          results = {"a": {"time": 1.2, "peak_memory": 200, "cardinality": 5},
+                     "b": {"time": 0.005, "peak_memory": 110, "cardinality": 5},
+                     "c": {"time": 2.0, "peak_memory": 100, "cardinality": 4},
+                     "d": {"time": 9.0, "peak_memory": 100, "cardinality": 5}}
+          self.assertEqual(find_regressions(results, baseline, tolerance = 0.25),
+                           [("a", "peak_memory", 100, 200), ("c", "cardinality", 5, 4), ("c", "time", 1.0, 2.0)])
+
+
+if __name__ == "__main__":
+     unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+
+import os
+import tempfile
+import unittest
+from maximum_matching import IndexedGraph, solve_indexed_graph
+from graph_io import *
+
+
+class TestReaders(unittest.TestCase):
+     def setUp(self):
+          self.directory = tempfile.TemporaryDirectory()
+
+     def tearDown(self):
+          self.directory.cleanup()
+
+     def write(self, name, text):
+          path = os.path.join(self.directory.name, name)
+          with open(path, "w") as f:
+               f.write(text)
+          return path
+
+
+     def test_read_edge_list(self):
+          """checks comments, repeated edges, self loops and reading in small chunks"""
+          path = self.write("graph.txt", "# a triangle and a pendant\n1 2\n2 3 0.5\n\n3 1\n2 1\n  % weight 7\n3 4\n5 5\n")
+          for chunk_size in [1, 8, CHUNK_SIZE]:
+               graph = read_edge_list(path, chunk_size = chunk_size)
+               self.assertEqual(list(graph.labels), [1, 2, 3, 4, 5])
+               self.assertEqual(graph.to_adjacency_dict(), {1: [2, 3], 2: [1, 3], 3: [1, 2, 4], 4: [3], 5: []})
+          self.assertEqual(solve_indexed_graph(graph)[1], 2)
+          graph = read_edge_list(self.write("labels.txt", "a b\nb c\n"), vertex_type = str)
+          self.assertEqual(graph.to_adjacency_dict(), {"a": ["b"], "b": ["a", "c"], "c": ["b"]})
+
+
+     def test_read_dimacs(self):
+          """checks a DIMACS edge file with comments, a repeated edge and a self loop"""
+          path = self.write("graph.col", "c a 5-cycle\nc\np edge 6 7\ne 1 2\ne 2 3\ne 3 4\ne 4 5\ne 5 1\ne 2 1\ne 3 3\n")
+          graph = read_graph(path, chunk_size = 4)
+          self.assertEqual(list(graph.labels), [1, 2, 3, 4, 5, 6])
+          self.assertEqual(graph.no_of_edges(), 5)
+          self.assertEqual(graph.degree(5), 0)
+          self.assertEqual(solve_indexed_graph(graph)[1], 2)
+
+
+     def test_read_matrix_market(self):
+          """checks symmetric pattern and general real Matrix Market files, with explicit zeros"""
+          path = self.write("graph.mtx", "%%MatrixMarket matrix coordinate pattern symmetric\n% a path\n4 4 3\n2 1\n3 2\n4 3\n")
+          expected = IndexedGraph.from_edges([(1, 2), (2, 3), (3, 4)]).to_adjacency_dict()
+          self.assertEqual(read_graph(path).to_adjacency_dict(), expected)
+          path = self.write("general.mtx", "%%MatrixMarket matrix coordinate real general\n4 4 7\n1 2 1.0\n2 1 1.0\n"
+                                           "2 3 2.5\n3 4 -1\n1 4 0\n4 4 1\n1 3 0.0\n")
+          graph = read_matrix_market(path, chunk_size = 1)
+          self.assertEqual(graph.to_adjacency_dict(), expected)
+          with self.assertRaises(AssertionError):
+               read_matrix_market(self.write("rectangular.mtx", "%%MatrixMarket matrix coordinate pattern general\n2 3 1\n1 3\n"))
+
+
+     @unittest.skipIf(np is None, "requires numpy")
+     def test_read_npz(self):
+          """checks upper triangle, labelled and explicit zero CSR .npz files, and the dispatch of saved graphs"""
+          path = os.path.join(self.directory.name, "graph.npz")
+          np.savez(path, indptr = np.array([0, 2, 3, 3]), indices = np.array([1, 2, 2]), format = np.array("csr"))
+          self.assertEqual(read_graph(path).to_adjacency_dict(), {0: [1, 2], 1: [0, 2], 2: [0, 1]})
+          np.savez(path, indptr = np.array([0, 2, 3, 3]), indices = np.array([1, 2, 2]), data = np.array([0.0, 2.5, 0.0]))
+          self.assertEqual(read_graph(path).to_adjacency_dict(), {0: [2], 1: [], 2: [0]})
+          np.savez(path, indptr = np.array([0, 1, 2]), indices = np.array([1, 0]), labels = np.array(["a", "b"]))
+          graph = read_npz(path)
+          self.assertEqual(graph.to_adjacency_dict(), {"a": ["b"], "b": ["a"]})
+          saved = os.path.join(self.directory.name, "graph.data")
+          save_graph(graph, saved)
+          self.assertEqual(read_graph(saved).to_adjacency_dict(), {"a": ["b"], "b": ["a"]})
+
+
+     def test_save_and_load_graph(self):
+          """checks the binary format round trip for range, integer and string labels"""
+          edge_list = [(0, 1), (1, 2), (2, 0), (2, 3)]
+          for labels in [range(4), [10, -5, 2**40, 7], ["a", "b", "c", "d"]]:
+               graph = IndexedGraph.from_edges([(labels[v], labels[w]) for v, w in edge_list], labels)
+               path = os.path.join(self.directory.name, "graph.bin")
+               save_graph(graph, path)
+               for use_numpy in [False, True] if np is not None else [False]:
+                    loaded = load_graph(path, use_numpy)
+                    self.assertEqual(list(loaded.labels), list(labels))
+                    self.assertEqual(list(loaded.indptr), list(graph.indptr))
+                    self.assertEqual(list(loaded.indices), list(graph.indices))
+                    self.assertEqual(solve_indexed_graph(loaded), solve_indexed_graph(graph))
+                    del loaded
+          with self.assertRaises(AssertionError):
+               load_graph(self.write("graph.txt", "1 2\n"))
+
+
+     def test_graph_format(self):
+          """checks the format read_graph picks for saved graphs, each extension of READERS and edge lists"""
+          saved = os.path.join(self.directory.name, "graph.mtx")
+          save_graph(IndexedGraph.from_edges([(0, 1)]), saved)
+          self.assertEqual(graph_format(saved), "saved")
+          self.assertEqual(graph_format(self.write("GRAPH.MTX", "%%MatrixMarket\n")), ".mtx")
+          self.assertEqual(graph_format(self.write("graph.col", "p edge 1 0\n")), ".col")
+          self.assertEqual(graph_format(self.write("graph.txt", "1 2\n")), "edge_list")
+          self.assertEqual(graph_format(self.write("graph", "1 2\n")), "edge_list")
+
+
+     def test_read_graph_cache(self):
+          """checks that read_graph saves the cache, then loads it instead of parsing"""
+          path = self.write("graph.txt", "1 2\n2 3\n")
+          cache = os.path.join(self.directory.name, "graph.bin")
+          graph = read_graph(path, cache = cache)
+          self.assertTrue(os.path.exists(cache))
+          os.utime(path, (0, 0))
+          loaded = read_graph(path, cache = cache)
+          self.assertIsInstance(loaded.indices, memoryview)
+          self.assertEqual(loaded.to_adjacency_dict(), graph.to_adjacency_dict())
+
+
+if __name__ == '__main__':
+     unittest.main()
@@ -2,8 +2,15 @@
 
 
 from collections import defaultdict, deque
-from time import time
+from time import perf_counter, time
 import pprint
+import contextlib
+import io
+import json
+import os
+import tempfile
+import inspect
+import sys
 import unittest
 from  maximum_matching import *
 
@@ -208,7 +215,66 @@ class TestGraphCreation(unittest.TestCase):
            #checking new adjacency matrix test case
            self.assertEqual(graph_adjacency_dict, {1:[2,5,7] , 5: [1,7], 7: [1,5], 2:[1], 3:[]})
 
-     
+
+     @unittest.skipIf(np is None, "numpy is not installed")
+     def test_create_graph_adjacency_dict_from_array(self):
+           """checks creation of an adjacency list (dictionary) representation from a numpy array"""
+           adjacency_matrix = np.array([[0,1,1,1,0],[1,0,1,0,0],[1,1,0,0,0],[1,0,0,0,0],[0,0,0,0,0]])
+           graph_adjacency_dict = create_graph_adjacency_dict_from_array(adjacency_matrix, [1,5,7,2,3])
+           self.assertEqual(graph_adjacency_dict, {1:[5,7,2] , 5: [1,7], 7: [1,5], 2:[1], 3:[]})
+
+           #vertices default to 0,1,...,n-1 and array-like input is accepted
+           graph_adjacency_dict = create_graph_adjacency_dict_from_array(adjacency_matrix.tolist())
+           self.assertEqual(graph_adjacency_dict, {0:[1,2,3] , 1: [0,2], 2: [0,1], 3:[0], 4:[]})
+
+           #checking symmetry, 0/1 entries and absence of self loops
+           with self.assertRaises(AssertionError):
+                create_graph_adjacency_dict_from_array([[0,1],[0,0]])
+           with self.assertRaises(AssertionError):
+                create_graph_adjacency_dict_from_array([[0,2],[2,0]])
+           with self.assertRaises(AssertionError):
+                create_graph_adjacency_dict_from_array([[1,0],[0,0]])
+           with self.assertRaises(AssertionError):
+                create_graph_adjacency_dict_from_array([[0,1],[1]])
+
+
+     def test_create_graph_adjacency_dict_from_edges(self):
+           """checks creation of an adjacency list (dictionary) representation from an edge list"""
+
+           #duplicate edges, reversed duplicates and self loops are dropped
+           edge_list = [(1,5), (1,7), (5,1), (5,7), (1,2), (7,7), (1,5)]
+           graph_adjacency_dict, vertices = create_graph_adjacency_dict_from_edges(edge_list, [1,5,7,2,3])
+           for v in graph_adjacency_dict:
+                graph_adjacency_dict[v].sort()
+           self.assertEqual(graph_adjacency_dict, {1:[2,5,7] , 5: [1,7], 7: [1,5], 2:[1], 3:[]})
+           self.assertEqual(vertices, {1,5,7,2,3})
+
+           #without list_of_vertices, the vertices are the endpoints of the edges
+           graph_adjacency_dict, vertices = create_graph_adjacency_dict_from_edges([(0,1),(1,2)])
+           self.assertEqual(vertices, {0,1,2})
+
+           #checking endpoints must lie in list_of_vertices
+           with self.assertRaises(AssertionError):
+                create_graph_adjacency_dict_from_edges([(0,1),(1,2)], [0,1])
+
+
+     def test_create_graph_adjacency_dict_from_csr(self):
+           """checks creation of an adjacency list (dictionary) representation from CSR arrays"""
+
+           #upper triangle of the adjacency matrix of the test case above
+           indptr = [0, 3, 4, 4, 4, 4]
+           indices = [1, 2, 3, 2]
+           graph_adjacency_dict, vertices = create_graph_adjacency_dict_from_csr(indptr, indices, [1,5,7,2,3])
+           for v in graph_adjacency_dict:
+                graph_adjacency_dict[v].sort()
+           self.assertEqual(graph_adjacency_dict, {1:[2,5,7] , 5: [1,7], 7: [1,5], 2:[1], 3:[]})
+           self.assertEqual(vertices, {1,5,7,2,3})
+
+           #checking indptr length matches with number of vertices
+           with self.assertRaises(AssertionError):
+                create_graph_adjacency_dict_from_csr(indptr, indices, [1,2,3])
+
+
 
          
      def test_create_quotient(self):
@@ -367,10 +433,521 @@ class TestMaxAndMaximalMatching(unittest.TestCase):
                pprint.pprint(max_matching_dict)
                self.assertEqual(max_matching_cardinality,answers[i])
 
+
+     def test_find_max_matching_multi_path(self):
+          """checks collecting several vertex-disjoint augmenting paths per forest"""
+          answers = [1,2,3,0,2]
+          for i in range(5):
+               max_matching_dict, max_matching_cardinality = find_max_matching(self.graph_adjacency_list[i],
+                                                                               Matching(dict(self.match_dict_list[i])),
+                                                                               self.vertices_list[i], multi_path = True)
+               self.assertEqual(max_matching_cardinality,answers[i])
+          graph_adj_dict = {0:[1], 1:[0,2], 2:[1,3], 3:[2], 4:[5], 5:[4,6], 6:[5,7], 7:[6]}
+          aug_paths = find_aug_paths(graph_adj_dict, Matching({0:None, 1:2, 2:1, 3:None, 4:None, 5:None, 6:None, 7:None}),
+                                     set(graph_adj_dict))
+          self.assertEqual(len(aug_paths), 3)
+          path_vertices = [v for aug_path in aug_paths for v in [aug_path[0][0]] + [y for (x,y) in aug_path]]
+          self.assertEqual(len(path_vertices), len(set(path_vertices)))
+
+
+     def test_find_max_matching_approximate(self):
+          """checks that the approximate mode only stops at long augmenting paths, and its upper bound, for every engine"""
+          graph_adj_dict = {0:[1], 1:[0,2], 2:[1,3], 3:[2,4], 4:[3,5], 5:[4]}
+          match_dict = {0:None, 1:2, 2:1, 3:4, 4:3, 5:None}
+          self.assertIsNone(find_aug_path(graph_adj_dict, Matching(dict(match_dict)), set(graph_adj_dict), max_length = 3))
+          for approximate, cardinality in [(1, 2), (2, 3)]:
+               current_matching = Matching(dict(match_dict))
+               self.assertEqual(find_max_matching(graph_adj_dict, current_matching, set(graph_adj_dict),
+                                                  approximate = approximate)[1], cardinality)
+               self.assertEqual(current_matching.upper_bound, 3)
+               for engine in ["auto", "phases", "reference"]:
+                    result = run_blossoms_algorithm_on_edges([(v, v+1) for v in range(5)], engine = engine, verbose = False,
+                                                             initial_matching = match_dict, approximate = approximate)
+                    self.assertEqual((result.cardinality, result.upper_bound), (cardinality, 3))
+                    self.assertEqual(result.ratio, cardinality/3)
+          with self.assertRaises(AssertionError):
+               solve_indexed_matching(IndexedGraph.from_edges([(0, 1)]), "indexed", approximate = 1)
+          answers = [1,2,3,0,2]
+          for i in range(5):
+               for multi_path in [False, True]:
+                    current_matching = Matching(dict(self.match_dict_list[i]))
+                    max_matching_dict, cardinality = find_max_matching(self.graph_adjacency_list[i], current_matching,
+                                                                       self.vertices_list[i], multi_path = multi_path,
+                                                                       approximate = 1)
+                    self.assertGreaterEqual(3*cardinality, 2*answers[i])
+                    self.assertGreaterEqual(current_matching.upper_bound, answers[i])
+
+
+     def test_find_max_matching_deadline(self):
+          """checks that a spent time budget returns the matching so far with an upper bound, for every engine,
+          that a search is abandoned after a blossom, and the upper bound itself"""
+          graph_adj_dict = {0:[1], 1:[0,2], 2:[1,3], 3:[2,4], 4:[3,5], 5:[4], 6:[7,8], 7:[6,8], 8:[6,7], 9:[]}
+          match_dict = {v: None for v in graph_adj_dict}
+          self.assertEqual(matching_upper_bound(graph_adj_dict, set(graph_adj_dict)), 4)
+          #out of time, only the components count: 9 vertices with an edge
+          self.assertEqual(matching_upper_bound(graph_adj_dict, set(graph_adj_dict), perf_counter()), 4)
+          #a star (bound 1, by the cover) and a path of 5 vertices (bound 2)
+          graph = IndexedGraph.from_edges([(0, 1), (0, 2), (0, 3), (4, 5), (5, 6), (6, 7), (7, 8)])
+          self.assertEqual(matching_upper_bound_indexed(graph), 3)
+          self.assertEqual(matching_upper_bound_indexed(graph, perf_counter()), 4)
+          for keywords, expected in [({"time_budget": 0}, (0, 4)), ({"deadline": perf_counter() + 60}, (4, 4)),
+                                     ({"approximate": 1, "time_budget": 0}, (0, 4))]:
+               current_matching = Matching(dict(match_dict))
+               self.assertEqual(len(find_max_matching(graph_adj_dict, current_matching, set(graph_adj_dict), **keywords)), 2)
+               self.assertEqual((current_matching.cardinality, current_matching.upper_bound), expected)
+          edge_list = [(v, w) for v in graph_adj_dict for w in graph_adj_dict[v] if v < w]
+          for engine in ["auto", "indexed", "phases", "reference"]:
+               for time_budget, expected in [(0, (0, 4)), (60, (4, 4))]:
+                    result = run_blossoms_algorithm_on_edges(edge_list, engine = engine, verbose = False,
+                                                             initial_matching = {}, time_budget = time_budget)
+                    self.assertEqual((result.cardinality, result.upper_bound), expected)
+          #a path 0-1-2-3-4-5 through the blossom 2-3-4, whose search is abandoned after the contraction
+          graph_adj_dict = {0:[1], 1:[0,2], 2:[1,3,4], 3:[2,4], 4:[3,2,5], 5:[4]}
+          match_dict = {0:None, 1:2, 2:1, 3:4, 4:3, 5:None}
+          self.assertIsNotNone(find_aug_path(graph_adj_dict, Matching(dict(match_dict)), set(graph_adj_dict), roots = {0}))
+          self.assertIsNone(find_aug_path(graph_adj_dict, Matching(dict(match_dict)), set(graph_adj_dict), roots = {0},
+                                          deadline = perf_counter()))
+          graph = IndexedGraph.from_edges([(v, w) for v in graph_adj_dict for w in graph_adj_dict[v] if v < w])
+          self.assertEqual(find_aug_paths_indexed(graph, IndexedMatching.from_match_dict(match_dict, graph.labels),
+                                                  deadline = perf_counter()), [])
+          answers = [1,2,3,0,2]
+          for i in range(5):
+               self.assertGreaterEqual(matching_upper_bound(self.graph_adjacency_list[i], self.vertices_list[i]), answers[i])
+
+
+     def test_gallai_edmonds_decomposition(self):
+          """checks the certificate of a blossom with a pendant path, and that the verifier rejects a smaller matching"""
+          #a triangle 0,1,2 with the path 2-3-4, and an isolated 5
+          graph_adj_dict = {0:[1,2], 1:[0,2], 2:[0,1,3], 3:[2,4], 4:[3], 5:[]}
+          match_dict = {0:1, 1:0, 2:None, 3:None, 4:None, 5:None}
+          self.assertIsNone(gallai_edmonds_decomposition(graph_adj_dict, match_dict, set(graph_adj_dict)))
+          match_dict = {0:1, 1:0, 2:3, 3:2, 4:None, 5:None}
+          certificate = gallai_edmonds_decomposition(graph_adj_dict, match_dict, set(graph_adj_dict))
+          self.assertEqual(certificate, {0:EVEN, 1:EVEN, 2:EVEN, 3:ODD, 4:EVEN, 5:EVEN})
+          self.assertTrue(verify_max_matching(graph_adj_dict, match_dict, certificate))
+          self.assertFalse(verify_max_matching(graph_adj_dict, {0:1, 1:0, 2:None, 3:None, 4:None, 5:None}, certificate))
+          self.assertFalse(verify_max_matching(graph_adj_dict, {0:None, 1:None, 2:4, 3:None, 4:2, 5:None}, certificate))
+          #a certificate (and matching) on part of the graph only proves nothing about the graph
+          path_adj_dict = {0:[1], 1:[0,2], 2:[1,3], 3:[2]}
+          self.assertFalse(verify_max_matching(path_adj_dict, {}, {}))
+          self.assertFalse(verify_max_matching(path_adj_dict, {0:1, 1:0}, {0:EVEN, 1:ODD}))
+          self.assertFalse(verify_max_matching({0:[1], 1:[0,2]}, {0:1, 1:0}, {0:UNLABELLED, 1:UNLABELLED}))
+          self.assertTrue(verify_max_matching({0:[1], 1:[0,2]}, {0:1, 1:0, 2:None}, {0:EVEN, 1:ODD, 2:EVEN}))
+          for i in range(5):
+               max_matching_dict, cardinality = find_max_matching(self.graph_adjacency_list[i],
+                                                                  Matching(dict(self.match_dict_list[i])), self.vertices_list[i])
+               certificate = gallai_edmonds_decomposition(self.graph_adjacency_list[i], max_matching_dict, self.vertices_list[i])
+               self.assertTrue(verify_max_matching(self.graph_adjacency_list[i], max_matching_dict, certificate))
+
+
+     def test_solver_certificate(self):
+          """checks the certificate returned with the matching by every engine, here and by components"""
+          graph_adj_dict = {0:[1,2], 1:[0,2], 2:[0,1,3], 3:[2,4], 4:[3], 5:[]}
+          edge_list = [(v, w) for v in graph_adj_dict for w in graph_adj_dict[v] if v < w]
+          for engine in ["auto", "indexed", "phases", "reference"]:
+               for max_workers in [None, 1]:
+                    result = run_blossoms_algorithm_on_edges(edge_list, list(graph_adj_dict), engine = engine,
+                                                             max_workers = max_workers, verbose = False)
+                    certificate = gallai_edmonds_decomposition(graph_adj_dict, result.match_dict, list(graph_adj_dict))
+                    self.assertEqual(result.certificate_dict, certificate)
+                    self.assertTrue(verify_max_matching(graph_adj_dict, result.match_dict, result.certificate_dict))
+          for engine in ["auto", "hopcroft_karp"]:
+               result = run_blossoms_algorithm_on_edges([(0,1), (1,2), (2,3), (3,4)], engine = engine, verbose = False)
+               self.assertEqual(result.certificate_dict, {0:EVEN, 1:ODD, 2:EVEN, 3:ODD, 4:EVEN})
+               result = run_blossoms_algorithm_on_edges([(0,1), (1,2), (2,3), (3,4)], engine = engine, verbose = False,
+                                                        time_budget = 0)
+               self.assertIsNone(result.certificate_dict)
+          matching = IndexedMatching(4)
+          matching.certificate = array('b', [EVEN])*4
+          matching.xor_aug_path([0, 1])
+          self.assertIsNone(matching.certificate)
+
+
+     def test_search_state(self):
+          """checks that one SearchState can be reused by successive searches"""
+          state = SearchState()
+          for i in [1, 4, 1]:
+               aug_path = find_aug_path(self.graph_adjacency_list[i], Matching(dict(self.match_dict_list[i])),
+                                        self.vertices_list[i], state = state)
+               self.assertTrue(aug_path)
+               self.assertLessEqual(state.edges_scanned(), 10)
+          state.reset()
+          self.assertEqual(state.forest.allnodes, set())
+          self.assertEqual(state.cursor, {})
+
+
+     def test_find_max_matching_without_recursion(self):
+          """checks that many augmentations and deeply nested blossoms need no recursion"""
+          path = {v: [w for w in (v-1, v+1) if 0 <= w < 200] for v in range(200)}
+          #a chain of 150 triangles (2i, 2i+1, 2i+2) with (2i+1, 2i+2) matched, and an edge (300, 301):
+          #from root 0, each triangle is a blossom containing the previous one
+          triangles = defaultdict(list)
+          for v, w in [(2*i + a, 2*i + b) for i in range(150) for a, b in [(0,1),(1,2),(0,2)]] + [(300,301)]:
+               triangles[v].append(w)
+               triangles[w].append(v)
+          match_dict = {v: None for v in triangles}
+          for i in range(150):
+               match_dict[2*i + 1], match_dict[2*i + 2] = 2*i + 2, 2*i + 1
+          recursion_limit = sys.getrecursionlimit()
+          sys.setrecursionlimit(len(inspect.stack()) + 50)
+          try:
+               max_matching_dict, max_matching_cardinality = find_max_matching(path, Matching({v: None for v in path}), set(path))
+               stats = SolverStats()
+               aug_path = find_aug_path(triangles, Matching(match_dict), set(triangles), {0}, stats)
+          finally:
+               sys.setrecursionlimit(recursion_limit)
+          self.assertEqual(max_matching_cardinality, 100)
+          self.assertEqual(stats.counters["max_nesting_depth"], 150)
+          self.assertEqual(len(aug_path), 301)
+          self.assertEqual({aug_path[0][0], aug_path[-1][1]}, {0, 301})
+          for (v, w), (x, y) in zip(aug_path, aug_path[1:]):
+               self.assertEqual(w, x)
+
                
 
      
 
+class TestIndexedCore(unittest.TestCase):
+     """ This class tests the integer-indexed, array-backed counterparts of Forest, Matching
+         and the graph adjacency dictionary defined in maximum_matching.py
+     """
+
+     def test_indexed_graph_creation(self):
+          """checks interning of vertex labels and the CSR arrays built from edges, CSR arrays and matrices"""
+          graph = IndexedGraph.from_edges([(1,5), (1,7), (5,1), (5,7), (1,2), (7,7)], [1,5,7,2,3])
+          self.assertEqual(list(graph.labels), [1,5,7,2,3])
+          self.assertEqual(list(graph.indptr), [0, 3, 5, 7, 8, 8])
+          self.assertEqual(list(graph.indices), [1, 2, 3, 0, 2, 0, 1, 0])
+          self.assertEqual(graph.no_of_edges(), 4)
+          self.assertEqual(list(graph[0]), [1, 2, 3])
+          self.assertEqual(graph.degree(4), 0)
+          self.assertEqual(graph.label_index(), {1:0, 5:1, 7:2, 2:3, 3:4})
+          self.assertEqual(graph.to_adjacency_dict(), {1:[5,7,2] , 5: [1,7], 7: [1,5], 2:[1], 3:[]})
+
+          same_graph = IndexedGraph.from_csr([0, 3, 4, 4, 4, 4], [1, 2, 3, 2], [1,5,7,2,3])
+          self.assertEqual(list(same_graph.indices), list(graph.indices))
+          adjacency_matrix = [[0,1,1,1,0],[1,0,1,0,0],[1,1,0,0,0],[1,0,0,0,0],[0,0,0,0,0]]
+          same_graph = IndexedGraph.from_adjacency_matrix(adjacency_matrix, [1,5,7,2,3])
+          self.assertEqual(list(same_graph.indices), list(graph.indices))
+          with self.assertRaises(AssertionError):
+               IndexedGraph.from_adjacency_matrix([[0,1],[0,0]])
+
+
+     def test_indexed_matching(self):
+          """checks conversion to and from match dictionaries and xor-ing of an augmenting path"""
+          labels = ["a", "b", "c", "d"]
+          matching = IndexedMatching.from_match_dict({"a": None, "b": "c", "c": "b", "d": None}, labels)
+          self.assertEqual(list(matching.mate), [-1, 2, 1, -1])
+          self.assertEqual(matching.cardinality, 1)
+          matching.xor_aug_path([0, 1, 2, 3])
+          self.assertEqual(list(matching.mate), [1, 0, 3, 2])
+          self.assertEqual(matching.cardinality, 2)
+          self.assertEqual(matching.to_match_dict(labels), {"a": "b", "b": "a", "c": "d", "d": "c"})
+
+
+     def test_indexed_forest_bloom(self):
+          """checks in-place contraction of a blossom and expansion of alternating paths through it"""
+          matching = IndexedMatching(13)
+          for v, w in [(3,12), (11,10), (0,9)]:
+               matching.mate[v], matching.mate[w] = w, v
+          mate = matching.mate
+          forest = IndexedForest(13)
+          forest.add_root(1)
+          for beg_node, end_node in [(1,3), (3,12), (12,11), (11,10), (12,0), (0,9)]:
+               forest.add_edge(beg_node, end_node)
+          self.assertEqual(forest.path_to_root(10, mate), [10, 11, 12, 3, 1])
+          self.assertEqual(list(forest.label[:4]), [1, 0, -1, 1])
+
+          #contracting the blossom closed by 10 - 9 makes 11 and 0 even, with base 12
+          self.assertEqual(forest.least_common_ancestor(10, 9, mate), 12)
+          self.assertEqual(forest.bloom(10, 9, mate), [11, 0])
+          self.assertEqual(forest.label[11], EVEN)
+          self.assertEqual({forest.base_of(v) for v in [12, 11, 10, 9, 0]}, {12})
+          self.assertEqual(forest.base_of(3), 3)
+          self.assertEqual(forest.path_to_root(11, mate), [11, 10, 9, 0, 12, 3, 1])
+          self.assertEqual(forest.path_to_root(0, mate), [0, 9, 10, 11, 12, 3, 1])
+          self.assertEqual(forest.alternating_path(0, 12, mate), [0, 9, 10, 11, 12])
+
+          #reset clears the vertices of the last search, prune retires them for good
+          forest.reset()
+          self.assertEqual(set(forest.label), {UNLABELLED})
+          self.assertEqual(forest.base_of(11), 11)
+          forest.add_root(1)
+          forest.add_edge(1, 3)
+          forest.prune()
+          forest.reset()
+          self.assertEqual([forest.label[1], forest.label[3], forest.label[12]], [HUNGARIAN, HUNGARIAN, UNLABELLED])
+
+
+     def test_find_aug_path_indexed(self):
+          """checks finding an augmenting path through nested blossoms with the indexed core"""
+          graph = IndexedGraph.from_edges([(0,1),(0,2),(0,3),(1,2),(1,4),(2,5),(2,8),(3,5),(3,12),(4,6),(4,7),
+                                           (5,7),(5,8),(6,9),(6,10),(7,10),(8,11),(9,10),(9,13),(10,13)])
+          match_dict = {0:None, 1:4, 2:5, 3:12, 4:1, 5:2, 6:9, 7:10, 8:11, 9:6,10:7, 11:8, 12:3, 13: None}
+          current_matching = IndexedMatching.from_match_dict(match_dict, graph.labels)
+          aug_path = find_aug_path_indexed(graph, current_matching)
+
+          #checks if the path is an augmenting path
+          self.assertEqual(len(set(aug_path)), len(aug_path))
+          self.assertEqual({aug_path[0], aug_path[-1]}, {graph.label_index()[0], graph.label_index()[13]})
+          for k in range(len(aug_path) - 1):
+               self.assertTrue(aug_path[k+1] in graph[aug_path[k]])
+               self.assertEqual(current_matching.mate[aug_path[k]] == aug_path[k+1], k % 2 == 1)
+          current_matching.xor_aug_path(aug_path)
+          self.assertEqual(current_matching.cardinality, 7)
+          self.assertEqual(find_aug_path_indexed(graph, current_matching), [])
+
+
+     def test_find_a_maximal_matching_karp_sipser(self):
+          """checks the degree 1 rule, odd cycles and the minimum degree fallback (K4)"""
+          edge_lists = [[(0,1),(1,2),(2,3),(3,4),(4,0)],
+                        [(0,1),(1,2),(2,3),(3,4),(4,0),(4,5),(5,6)],
+                        [(0,1),(0,2),(0,3),(1,2),(1,3),(2,3),(3,4)],
+                        [(0,1),(0,2),(0,3),(0,4),(1,5),(2,5),(3,6),(4,6)]]
+          answers = [2, 3, 2, 3]
+          for edge_list, answer in zip(edge_lists, answers):
+               graph = IndexedGraph.from_edges(edge_list)
+               matching = find_a_maximal_matching_karp_sipser(graph)
+               self.assertEqual(matching.cardinality, answer)
+               mate = matching.mate
+               for v in range(len(graph)):
+                    if mate[v] != UNMATCHED:
+                         self.assertEqual(mate[mate[v]], v)
+                         self.assertTrue(mate[v] in graph[v])
+                    else:
+                         self.assertTrue(all(mate[w] != UNMATCHED for w in graph[v]))
+
+
+     def test_two_colouring(self):
+          """checks bipartiteness detection"""
+          graph = IndexedGraph.from_edges([(0,1),(1,2),(2,3),(3,0),(4,5)], [0,1,2,3,4,5,6])
+          colour = two_colouring(graph)
+          self.assertEqual(list(colour), [0, 1, 0, 1, 0, 1, 0])
+          self.assertIsNone(two_colouring(IndexedGraph.from_edges([(0,1),(1,2),(2,3),(3,0),(0,2)])))
+
+
+     def test_find_max_matching_hopcroft_karp(self):
+          """checks finding maximum matching in bipartite graphs with Hopcroft-Karp, and the auto engine dispatch"""
+          edge_lists = [[(0,1),(1,2),(2,3),(3,0),(4,5)],
+                        [(0,4),(0,5),(1,4),(2,5),(2,6),(3,6),(3,7)],
+                        [(0,3),(1,3),(2,3)]]
+          answers = [3, 4, 1]
+          for edge_list, answer in zip(edge_lists, answers):
+               graph = IndexedGraph.from_edges(edge_list)
+               colour = two_colouring(graph)
+               for current_matching in [IndexedMatching(len(graph)), find_a_maximal_matching_indexed(graph)]:
+                    find_max_matching_hopcroft_karp(graph, current_matching, colour)
+                    self.assertEqual(current_matching.cardinality, answer)
+                    mate = current_matching.mate
+                    for v in range(len(graph)):
+                         if mate[v] != UNMATCHED:
+                              self.assertEqual(mate[mate[v]], v)
+                              self.assertTrue(mate[v] in graph[v])
+               final_match_dict, no_of_matched_edges = solve_indexed_graph(graph)
+               self.assertEqual(no_of_matched_edges, answer)
+
+          #an odd cycle sends the auto engine to the general solver, and rules out hopcroft_karp
+          graph = IndexedGraph.from_edges([(0,1),(1,2),(2,0),(2,3)])
+          self.assertEqual(solve_indexed_graph(graph)[1], 2)
+          with self.assertRaises(AssertionError):
+               solve_indexed_graph(graph, "hopcroft_karp")
+
+
+     def test_find_aug_paths_indexed(self):
+          """checks that one forest build collects vertex-disjoint augmenting paths from several trees"""
+          #two paths 0-1-2-3 and 4-5-6-7 with matched middle edges, joined by the edge 2-5
+          graph = IndexedGraph.from_edges([(0,1),(1,2),(2,3),(4,5),(5,6),(6,7),(2,5)])
+          current_matching = IndexedMatching.from_match_dict({0:None, 1:2, 2:1, 3:None, 4:None, 5:6, 6:5, 7:None},
+                                                             graph.labels)
+          aug_paths = find_aug_paths_indexed(graph, current_matching)
+          self.assertEqual(len(aug_paths), 2)
+          self.assertFalse(set(aug_paths[0]) & set(aug_paths[1]))
+          for aug_path in aug_paths:
+               current_matching.xor_aug_path(aug_path)
+          self.assertEqual(current_matching.cardinality, 4)
+          self.assertEqual(find_aug_paths_indexed(graph, current_matching), [])
+
+
+     def test_find_max_matching_indexed(self):
+          """checks finding maximum matching with the indexed core, from scratch and from a maximal matching"""
+          edge_lists = [[(0,1),(1,2),(2,0)],
+                        [(0,1),(0,2),(0,3),(1,2),(3,4)],
+                        [(0,1),(0,3),(1,2),(2,3),(4,5)],
+                        [(0,1),(1,2),(2,3),(3,4),(4,0),(0,5),(2,6),(6,7),(7,8),(8,6),(8,9)]]
+          answers = [1, 2, 3, 5]
+          for edge_list, answer in zip(edge_lists, answers):
+               graph = IndexedGraph.from_edges(edge_list)
+               for current_matching, find_max in [(IndexedMatching(len(graph)), find_max_matching_indexed),
+                                                  (find_a_maximal_matching_indexed(graph), find_max_matching_indexed),
+                                                  (IndexedMatching(len(graph)), find_max_matching_phases)]:
+                    find_max(graph, current_matching)
+                    self.assertEqual(current_matching.cardinality, answer)
+                    mate = current_matching.mate
+                    for v in range(len(graph)):
+                         if mate[v] != UNMATCHED:
+                              self.assertEqual(mate[mate[v]], v)
+                              self.assertTrue(mate[v] in graph[v])
+
+
+     def test_warm_start(self):
+          """checks that only the legal part of an initial matching is kept, and solving from it"""
+          edge_list = [('a','b'),('b','c'),('c','d'),('d','e'),('e','f'),('a','f')]
+          graph = IndexedGraph.from_edges(edge_list)
+          match_dict = {'a': 'b', 'b': 'a', 'c': 'e', 'e': 'c', 'd': 'x', 'x': 'd', 'f': 'a', 'g': None}
+          matching = IndexedMatching.from_warm_start(match_dict, graph)
+          self.assertEqual(matching.to_match_dict(graph.labels), {'a': 'b', 'b': 'a', 'c': None, 'd': None, 'e': None, 'f': None})
+          self.assertEqual(matching.cardinality, 1)
+          self.assertEqual(IndexedMatching.from_warm_start(Matching(match_dict), graph).cardinality, 1)
+          self.assertEqual(IndexedMatching.from_warm_start(matching, graph).mate, matching.mate)
+
+          for engine in ENGINES:
+               for max_workers in [None, 1]:
+                    final_match_dict, no_of_matched_edges = solve_indexed_graph(graph, engine, max_workers, match_dict)
+                    self.assertEqual(no_of_matched_edges, 3)
+                    self.assertIsNotNone(final_match_dict['a'])
+
+          #removing a matched edge: the rest of the matching is reused
+          final_match_dict, no_of_matched_edges = solve_indexed_graph(graph)
+          edge_list.remove(('c','d') if final_match_dict['c'] == 'd' else ('d','e'))
+          new_graph = IndexedGraph.from_edges(edge_list)
+          final_match_dict, no_of_matched_edges = solve_indexed_graph(new_graph, initial_matching = final_match_dict)
+          self.assertEqual(no_of_matched_edges, 3)
+
+
+     def test_solve_indexed_graph_by_components(self):
+          """checks component decomposition, and solving components inline and in worker processes"""
+          edge_list = [(0,1),(1,2),(2,0),(2,3),(4,5),(5,6),(6,7),(7,8),(8,4),(9,10)]
+          graph = IndexedGraph.from_edges(edge_list, list(range(12)))
+          self.assertEqual(connected_components(graph), [[0,1,2,3],[4,5,8,6,7],[9,10]])
+          self.assertEqual(graph.induced_subgraph([9,10]).to_adjacency_dict(), {0: [1], 1: [0]})
+          for max_workers, min_parallel_size in [(1, 1), (2, 1), (2, 10), (None, 100)]:
+               final_match_dict, no_of_matched_edges = solve_indexed_graph_by_components(graph, "auto", max_workers, min_parallel_size)
+               self.assertEqual(no_of_matched_edges, 5)
+               self.assertIsNone(final_match_dict[11])
+               for v, w in final_match_dict.items():
+                    if w is not None:
+                         self.assertEqual(final_match_dict[w], v)
+                         self.assertTrue((v, w) in edge_list or (w, v) in edge_list)
+
+
+     def test_matching_result(self):
+          """checks the MatchingResult returned by the run_blossoms_algorithm functions, printed only if verbose"""
+          edge_list = [("a","b"),("b","c"),("c","a"),("c","d")]
+          output = io.StringIO()
+          with contextlib.redirect_stdout(output):
+               result = run_blossoms_algorithm_on_edges(edge_list, ["a","b","c","d","e"], verbose = False)
+          self.assertEqual(output.getvalue(), "")
+          self.assertEqual(result.cardinality, 2)
+          self.assertEqual(set(result.timings), {"build_graph", "solve", "total"})
+          self.assertEqual(result.match_dict["e"], None)
+          self.assertEqual(result.match_dict["d"], "c")
+          self.assertEqual(len(result.edges()), 2)
+          for v, w in result.edges():
+               self.assertEqual(result.match_dict[v], w)
+          with contextlib.redirect_stdout(output):
+               result = run_blossoms_algorithm([[0,1],[1,0]], ["x","y"])
+          self.assertIn("1", output.getvalue())
+          self.assertEqual(result.edges(), [("x","y")])
+
+
+class TestDynamicMatching(unittest.TestCase):
+     def test_find_aug_path_from_roots(self):
+          """checks that a search from some roots ends at any unmatched vertex, through a blossom with a stem"""
+          #root 0, stem 0-1=2, blossom 2,3,4 and the unmatched vertex 5 hanging off 4
+          graph_adj_dict = {0:[1], 1:[0,2], 2:[1,3,4], 3:[2,4], 4:[2,3,5], 5:[4], 6:[]}
+          match_dict = {0:None, 1:2, 2:1, 3:4, 4:3, 5:None, 6:None}
+          current_matching = Matching(dict(match_dict))
+          aug_path = find_aug_path(graph_adj_dict, current_matching, set(range(7)), {0})
+          self.assertIn(aug_path, [[(0,1),(1,2),(2,3),(3,4),(4,5)], [(5,4),(4,3),(3,2),(2,1),(1,0)]])
+          self.assertEqual(current_matching.matchdict, match_dict)
+          self.assertFalse(find_aug_path(graph_adj_dict, current_matching, set(range(7)), {6}))
+
+
+     def test_dynamic_matching(self):
+          """checks that the matching stays maximum under edge and vertex updates"""
+          dynamic_matching = DynamicMatching([(0,1),(1,2),(2,3)], [0,1,2,3,4])
+          self.assertEqual(dynamic_matching.cardinality, 2)
+          dynamic_matching.remove_edge(0,1)
+          self.assertEqual(dynamic_matching.cardinality, 1)
+          dynamic_matching.add_edge(3,4)
+          self.assertEqual(dynamic_matching.cardinality, 2)
+          dynamic_matching.add_edge(0,4)
+          dynamic_matching.add_edge(5,6)
+          self.assertEqual(dynamic_matching.cardinality, 3)
+          dynamic_matching.add_edge(1,0)
+          #path 1-2-3-4-0-1 is now a 5-cycle
+          self.assertEqual(dynamic_matching.cardinality, 3)
+          dynamic_matching.add_vertex(7)
+          dynamic_matching.add_edge(7,2)
+          self.assertEqual(dynamic_matching.cardinality, 4)
+          dynamic_matching.remove_vertex(5)
+          self.assertEqual(dynamic_matching.cardinality, 3)
+          self.assertIsNone(dynamic_matching.matchdict[6])
+          dynamic_matching.remove_vertex(2)
+          self.assertEqual(dynamic_matching.cardinality, 2)
+          match_dict = dynamic_matching.matchdict
+          self.assertEqual(set(match_dict), {0,1,3,4,6,7})
+          for v, w in match_dict.items():
+               if w is not None:
+                    self.assertEqual(match_dict[w], v)
+                    self.assertTrue(w in dynamic_matching.graph_adjacency_dict[v])
+          with self.assertRaises(AssertionError):
+               dynamic_matching.remove_edge(0,3)
+
+
+class TestSolverStats(unittest.TestCase):
+     def test_solver_stats(self):
+          """checks the counters, phase timings and events recorded for each engine"""
+          #a 5-cycle with a pendant vertex: one blossom, three augmentations from an empty matching
+          graph = IndexedGraph.from_edges([(0,1),(1,2),(2,3),(3,4),(4,0),(4,5)])
+          for engine in ("auto", "indexed", "phases", "reference"):
+               events = []
+               stats = SolverStats(callback = events.append)
+               final_match_dict, no_of_matched_edges = solve_indexed_graph(graph, engine, initial_matching = {}, stats = stats)
+               self.assertEqual(no_of_matched_edges, 3)
+               self.assertEqual(stats.counters["augmentations"], 3)
+               self.assertGreaterEqual(stats.counters["searches"], 2)
+               self.assertGreater(stats.counters["edges_scanned"], 0)
+               self.assertTrue({"initial_matching", "augment", "output"} <= set(stats.timings))
+               searches = [event for event in events if event["event"] == "search"]
+               self.assertEqual(len(searches), stats.counters["searches"])
+               self.assertEqual(sum(event["paths"] for event in searches), 3)
+               self.assertEqual(sum(event["blossoms"] for event in searches), stats.counters["blossoms"])
+               #the time of the searches is split into forest growth, blossom contraction and path expansion
+               self.assertAlmostEqual(stats.timings["forest_growth"] + stats.timings["blossom_contraction"] +
+                                      stats.timings["path_expansion"], sum(event["seconds"] for event in searches))
+               self.assertGreater(stats.timings["path_expansion"], 0)
+               self.assertEqual(stats.timings["blossom_contraction"] > 0, stats.counters["blossoms"] > 0)
+
+          stats = SolverStats()
+          graph = IndexedGraph.from_edges([(0,1),(1,2),(2,3),(3,0),(4,5)])
+          solve_indexed_graph(graph, "hopcroft_karp", initial_matching = {}, stats = stats)
+          self.assertEqual(stats.counters["augmentations"], 3)
+          self.assertTrue("two_colouring" in stats.timings)
+          self.assertGreater(stats.timings["path_expansion"], 0)
+          self.assertEqual(stats.timings["blossom_contraction"], 0)
+
+
+     def test_solver_stats_nesting_and_jsonl(self):
+          """checks the nesting depth of the reference engine and the JSON lines sink"""
+          #the blossom 2,3,4 (reached through the stem 0-1=2) is itself in the blossom 2,3,4,5,6
+          graph_adj_dict = {0:[1], 1:[0,2], 2:[1,3,4], 3:[2,4,6], 4:[2,3,5], 5:[4,6,9], 6:[5,3], 9:[5]}
+          match_dict = {0:None, 1:2, 2:1, 3:4, 4:3, 5:6, 6:5, 9:None}
+          with tempfile.TemporaryDirectory() as directory:
+               path = os.path.join(directory, "stats.jsonl")
+               with SolverStats(jsonl_file = path) as stats:
+                    aug_path = find_aug_path(graph_adj_dict, Matching(match_dict), set(graph_adj_dict), {0}, stats)
+               with open(path) as f:
+                    events = [json.loads(line) for line in f]
+          self.assertTrue(aug_path)
+          self.assertEqual(events[-1]["event"], "search")
+          self.assertEqual(events[-1]["blossoms"], stats.counters["blossoms"])
+          self.assertEqual([event["depth"] for event in events if event["event"] == "blossom"],
+                           list(range(1, stats.counters["blossoms"] + 1)))
+          self.assertEqual(stats.counters["max_nesting_depth"], 2)
+          self.assertEqual(stats.counters["blossoms"], 2)
+
+
 if __name__ == "__main__":
      unittest.main()
      
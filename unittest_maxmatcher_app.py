@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+app_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Heroku_maxmatcher_app")
+sys.path.append(app_directory)
+import MaxMatcher_a_web_app as app
+
+
+def sleep_for(seconds):
+     time.sleep(seconds)
+     return 0, "slept", None
+
+
+def raise_error():
+     raise ValueError("no matching")
+
+
+def exit_process():
+     os._exit(1)
+
+
+class TestResultCache(unittest.TestCase):
+     """
+     This class tests the ResultCache and graph_key of the web app
+     """
+
+     def test_lru_order(self):
+          """checks that a lookup refreshes an entry and the least recently used one is evicted"""
+          cache = app.ResultCache(max_size = 2, ttl = None)
+          cache.put("a", 1)
+          cache.put("b", 2)
+          self.assertEqual(cache.get("a"), 1)
+          cache.put("c", 3)
+          self.assertIsNone(cache.get("b"))
+          self.assertEqual(cache.get("a"), 1)
+          self.assertEqual(cache.get("c"), 3)
+          self.assertEqual(list(cache.entries), ["a", "c"])
+          app.ResultCache(max_size = 0).put("a", 1)
+
+
+     def test_ttl_expiry(self):
+          """checks that entries expire ttl seconds after they are stored, and never without a ttl"""
+          for ttl, expected in [(10, None), (None, 1)]:
+               cache = app.ResultCache(ttl = ttl)
+               with mock.patch.object(app, "monotonic", return_value = 100.0):
+                    cache.put("a", 1)
+               with mock.patch.object(app, "monotonic", return_value = 109.0):
+                    self.assertEqual(cache.get("a"), 1)
+               with mock.patch.object(app, "monotonic", return_value = 110.0):
+                    self.assertEqual(cache.get("a"), expected)
+               self.assertEqual(len(cache.entries), 0 if expected is None else 1)
+
+
+     def test_hits_and_misses(self):
+          """checks the counts of stats"""
+          cache = app.ResultCache()
+          self.assertIsNone(cache.get("a"))
+          cache.put("a", 1)
+          cache.get("a")
+          cache.get("a")
+          cache.get("b")
+          self.assertEqual(cache.stats(), {"hits": 2, "misses": 2, "size": 1})
+
+
+     def test_graph_key(self):
+          """checks that the same matrix typed differently has one key, and different matrices do not"""
+          matrix = [[0, 1], [1, 0]]
+          key = app.graph_key(matrix)
+          self.assertEqual(app.graph_key(app.get_adjacency_matrix("0,1\n1,0")), key)
+          self.assertEqual(app.graph_key(app.get_adjacency_matrix(" 0 , 1 ,\n\n1,   0\n")), key)
+          self.assertEqual(app.graph_key(((0, 1), (1, 0))), key)
+          self.assertNotEqual(app.graph_key([[0, 2], [2, 0]]), key)
+          self.assertNotEqual(app.graph_key([[0, 1, 0, 1]]), key)
+          self.assertNotEqual(app.graph_key([[0, 0], [0, 0]]), key)
+          self.assertIsNone(app.graph_key([[0, 1], [1]]))
+          self.assertIsNone(app.graph_key([0, 1]))
+
+
+class TestJobQueue(unittest.TestCase):
+     """
+     This class tests the JobQueue, the admission control and the graph file jobs of the web app
+     """
+
+     def test_done(self):
+          """checks that a job returns its result, and that valid results are cached"""
+          cache = app.ResultCache()
+          job_queue = app.JobQueue(cache = cache)
+          job_id = job_queue.submit(app.solve_matrix, ([[0, 1], [1, 0]],), "key")
+          self.assertEqual(job_queue.wait(job_id, 30), ("done", (1, "0: 1 \n1: 0 \n", None)))
+          self.assertEqual(cache.get("key"), (1, "0: 1 \n1: 0 \n", None))
+          self.assertEqual(job_queue.status("0"), ("unknown", None))
+
+
+     def test_result_file_deleted(self):
+          """checks that the matched edges file of a graph file job is deleted once the job is forgotten"""
+          job_queue = app.JobQueue(keep = 0.2)
+          with tempfile.TemporaryDirectory() as directory:
+               path = os.path.join(directory, "graph.txt")
+               with open(path, "w") as f:
+                    f.write("1 2\n2 3\n3 4\n")
+               job_id = job_queue.submit(app.solve_graph_file, (path,))
+               status, result = job_queue.wait(job_id, 30)
+          self.assertEqual((status, result[0]), ("done", 2))
+          self.assertTrue(os.path.exists(result[2]))
+          for _ in range(100):
+               if job_queue.status(job_id)[0] == "unknown":
+                    break
+               time.sleep(0.05)
+          self.assertEqual(job_queue.status(job_id), ("unknown", None))
+          self.assertFalse(os.path.exists(result[2]))
+
+
+     def test_graph_file_errors(self):
+          """checks that an edge list may have string vertices, but a corrupt file of another format is not
+             read as one: its own error is returned"""
+          with tempfile.TemporaryDirectory() as directory:
+               path = os.path.join(directory, "graph.txt")
+               with open(path, "w") as f:
+                    f.write("a b\nb c\n")
+               result = app.solve_graph_file(path)
+               self.assertEqual(result[0], 1)
+               os.remove(result[2])
+               path = os.path.join(directory, "graph.mtx")
+               with open(path, "w") as f:
+                    f.write("%%MatrixMarket matrix coordinate pattern symmetric\n2 2 1\na b\n")
+               with self.assertRaises(ValueError) as error:
+                    app.read_graph(path)
+               my_msg = f"Invalid graph file : {error.exception}"
+               self.assertEqual(app.solve_graph_file(path), (my_msg, my_msg, None))
+
+
+     def test_timeout(self):
+          """checks that a job running longer than the timeout is stopped"""
+          job_queue = app.JobQueue(timeout = 0.2)
+          job_id = job_queue.submit(sleep_for, (60,))
+          status, result = job_queue.wait(job_id, 30)
+          self.assertEqual((status, result), ("timeout", None))
+          self.assertEqual(job_queue.running, [])
+
+
+     def test_cancel(self):
+          """checks cancelling a running and a queued job, and a finished one"""
+          job_queue = app.JobQueue(max_workers = 1)
+          running_id = job_queue.submit(sleep_for, (60,))
+          queued_id = job_queue.submit(sleep_for, (60,))
+          self.assertEqual(job_queue.wait(running_id, 0.5)[0], "running")
+          self.assertEqual(job_queue.status(queued_id)[0], "queued")
+          self.assertTrue(job_queue.cancel(queued_id))
+          self.assertTrue(job_queue.cancel(running_id))
+          self.assertEqual(job_queue.status(queued_id), ("cancelled", None))
+          self.assertEqual(job_queue.status(running_id), ("cancelled", None))
+          self.assertFalse(job_queue.cancel(running_id))
+          self.assertFalse(job_queue.cancel("0"))
+          self.assertEqual((job_queue.running, list(job_queue.queued)), ([], []))
+
+
+     def test_queue_full(self):
+          """checks that submit returns None once max_queued jobs are waiting"""
+          job_queue = app.JobQueue(max_workers = 0, max_queued = 2)
+          self.assertIsNotNone(job_queue.submit(sleep_for, (0,)))
+          self.assertIsNotNone(job_queue.submit(sleep_for, (0,)))
+          self.assertIsNone(job_queue.submit(sleep_for, (0,)))
+
+
+     def test_failed(self):
+          """checks a job whose process dies, and one that raises: the error is its result, not cached"""
+          cache = app.ResultCache()
+          job_queue = app.JobQueue(cache = cache)
+          job_id = job_queue.submit(exit_process, ())
+          self.assertEqual(job_queue.wait(job_id, 30), ("failed", None))
+          job_id = job_queue.submit(raise_error, (), "key")
+          self.assertEqual(job_queue.wait(job_id, 30), ("done", ("Error : no matching",)*2 + (None,)))
+          self.assertIsNone(cache.get("key"))
+
+
+     def test_admission(self):
+          """checks that too many lines, too many entries or too long a text are rejected before parsing"""
+          job_queue = app.JobQueue(max_workers = 0)
+          with mock.patch.object(app, "get_job_queue", return_value = job_queue), \
+               mock.patch.object(app, "cost_budget", 16), \
+               mock.patch.object(app, "get_adjacency_matrix", side_effect = AssertionError("parsed")):
+               for matrix in ["0\n"*5, ",".join("0"*20) + "\n0", "1"*100]:
+                    result = app.run_max_matcher(matrix)
+                    self.assertTrue(result[0].startswith("Rejected :"))
+                    self.assertEqual(result[0], result[1])
+          self.assertEqual(job_queue.jobs, {})
+          with mock.patch.object(app, "get_job_queue", return_value = job_queue), \
+               mock.patch.object(app, "cost_budget", 16), mock.patch.object(app, "wait_seconds", 0):
+               result = app.run_max_matcher("0,1,0,0\n1,0,0,0\n0,0,0,1\n0,0,1,0\n\n")
+               self.assertFalse(result[0].startswith("Rejected :"))
+          self.assertEqual(len(job_queue.jobs), 1)
+
+
+class TestDeployment(unittest.TestCase):
+     """
+     This class tests the directory that build.sh assembles for Heroku
+     """
+
+     def test_build(self):
+          """checks, in a fresh interpreter in the built directory only, that it holds everything the app
+             imports, and that importing the app does not import gradio or start a job queue, thread or process"""
+          code = ("import json, multiprocessing, sys, threading\n"
+                  "import MaxMatcher_a_web_app as app\n"
+                  "print(json.dumps([sys.modules['maximum_matching'].__file__, 'gradio' in sys.modules,\n"
+                  "                  app.job_queue is None, threading.active_count(),\n"
+                  "                  len(multiprocessing.active_children())]))")
+          with tempfile.TemporaryDirectory() as directory:
+               build_directory = os.path.join(directory, "build")
+               subprocess.run(["sh", os.path.join(app_directory, "build.sh"), build_directory], check = True, timeout = 60)
+               self.assertEqual(sorted(os.listdir(build_directory)),
+                                ["MaxMatcher_a_web_app.py", "Procfile", "graph_io.py", "maximum_matching.py",
+                                 "requirements.txt", "setup.sh"])
+               output = subprocess.run([sys.executable, "-c", code], cwd = build_directory, capture_output = True,
+                                       text = True, timeout = 60, env = dict(os.environ, PYTHONPATH = ""))
+               self.assertEqual(output.returncode, 0, output.stderr)
+               module_file, is_gradio_imported, is_idle, no_of_threads, no_of_processes = json.loads(output.stdout)
+               self.assertEqual(os.path.dirname(os.path.join(build_directory, module_file)), build_directory)
+          self.assertEqual((is_gradio_imported, is_idle, no_of_threads, no_of_processes), (False, True, 1, 0))
+
+
+if __name__ == '__main__':
+     unittest.main()